@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from markdown_blocks import (
+    BlockType,
+    markdown_to_blocks,
+    block_to_block_type,
+    markdown_to_html_node,
+)
+from inline_markdown import text_to_textnodes
+from gencontent import first_heading
+from pagetemplate import PageTemplate
+
+STAGES = [
+    "markdown_to_blocks",
+    "block_to_block_type",
+    "text_to_textnodes",
+    "to_html_node",
+    "to_html",
+    "template_splice",
+    "file_write",
+]
+
+BENCH_TEMPLATE = """<!doctype html>
+<html>
+<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet"></head>
+<body><article>{{ Content }}</article></body>
+</html>
+"""
+
+WORDS = [
+    "lorem", "ipsum", "dolor", "sit", "amet", "elf", "hobbit", "ring",
+    "shire", "river", "mountain", "forest", "song", "tale", "road", "star",
+]
+
+
+# Synthetic corpora. Each generator returns the markdown of one page;
+# size scales the number of blocks per page.
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def inline_text(rng, count):
+    parts = []
+    for _ in range(count):
+        kind = rng.randrange(6)
+        if kind == 0:
+            parts.append(f"**{words(rng, 2)}**")
+        elif kind == 1:
+            parts.append(f"_{words(rng, 2)}_")
+        elif kind == 2:
+            parts.append(f"`{rng.choice(WORDS)}`")
+        else:
+            parts.append(words(rng, 4))
+    return " ".join(parts)
+
+def link(rng):
+    return f"[{words(rng, 2)}](/{rng.choice(WORDS)}/{rng.randrange(1000)})"
+
+def paragraph_page(rng, size):
+    blocks = [f"# {words(rng, 3)}"]
+    for i in range(size * 4):
+        if i % 8 == 0:
+            blocks.append(f"## {words(rng, 3)}")
+        lines = [inline_text(rng, 6) for _ in range(3)]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def link_page(rng, size):
+    blocks = [f"# {words(rng, 3)}"]
+    for _ in range(size * 2):
+        blocks.append(" ".join(f"{link(rng)} {words(rng, 1)}" for _ in range(20)))
+        blocks.append("\n".join(f"- {link(rng)} ![{words(rng, 1)}](/images/{i}.png)" for i in range(10)))
+    return "\n\n".join(blocks)
+
+def list_page(rng, size):
+    blocks = [f"# {words(rng, 3)}"]
+    for _ in range(size):
+        blocks.append("\n".join(f"- {inline_text(rng, 3)}" for _ in range(50)))
+        blocks.append("\n".join(f"{i}. {inline_text(rng, 2)}" for i in range(1, 51)))
+        blocks.append("\n".join(f"> {inline_text(rng, 2)}" for _ in range(10)))
+    return "\n\n".join(blocks)
+
+def code_page(rng, size):
+    blocks = [f"# {words(rng, 3)}"]
+    for _ in range(size):
+        blocks.append(inline_text(rng, 4))
+        code_lines = [f"    {rng.choice(WORDS)}_{i} = {rng.randrange(100)} * x  # {words(rng, 3)}" for i in range(60)]
+        blocks.append("```\ndef example():\n" + "\n".join(code_lines) + "\n```")
+    return "\n\n".join(blocks)
+
+# Code whose every line needs HTML escaping (<, > and &)
+def escaped_code_page(rng, size):
+    blocks = [f"# {words(rng, 3)}"]
+    for _ in range(size):
+        blocks.append(inline_text(rng, 4))
+        code_lines = [
+            f"    {rng.choice(WORDS)}_{i} = {rng.randrange(100)} * x if a < b && c > 0 else '<tag>'  # {words(rng, 3)}"
+            for i in range(60)
+        ]
+        blocks.append("```\ndef example():\n" + "\n".join(code_lines) + "\n```")
+    return "\n\n".join(blocks)
+
+def small_page(rng, size):
+    return f"# {words(rng, 2)}\n\n{inline_text(rng, 4)}\n\n- {link(rng)}"
+
+CORPORA = {
+    "paragraphs": paragraph_page,
+    "links": link_page,
+    "lists": list_page,
+    "code": code_page,
+    "escaped_code": escaped_code_page,
+    "small": small_page,
+}
+
+# Many-small-pages corpus gets more pages for the same --pages budget
+PAGE_MULTIPLIER = {"small": 10}
+
+
+def make_corpus(kind, pages, size=4, seed=0):
+    rng = random.Random(f"{kind}-{seed}")
+    page_count = pages * PAGE_MULTIPLIER.get(kind, 1)
+    return [CORPORA[kind](rng, size) for _ in range(page_count)]
+
+
+def time_stage(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+# Timing each pipeline stage separately over one corpus. Inputs for a stage
+# are prepared outside of its timed region.
+def bench_corpus(corpus, repeat=3):
+    documents = [markdown_to_blocks(markdown) for markdown in corpus]
+    blocks = [block for document in documents for block in document]
+    block_types = [block_to_block_type(block) for block in blocks]
+    inline_texts = []
+    for block, block_type in zip(blocks, block_types):
+        if block_type == BlockType.PARAGRAPH:
+            inline_texts.append(block.replace("\n", " "))
+        elif block_type in (BlockType.ULIST, BlockType.OLIST):
+            inline_texts.extend(line.split(" ", 1)[-1] for line in block.split("\n"))
+    html_nodes = [markdown_to_html_node(markdown) for markdown in corpus]
+    titles = [first_heading(markdown.split("\n")) or "" for markdown in corpus]
+    html_pages = [html_node.to_html() for html_node in html_nodes]
+    template = PageTemplate(BENCH_TEMPLATE, "/")
+    final_pages = [template.render(title, html) for title, html in zip(titles, html_pages)]
+
+    def write_files():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i, page in enumerate(final_pages):
+                with open(os.path.join(tmp_dir, f"{i}.html"), "w") as file:
+                    file.write(page)
+
+    stages = {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(markdown) for markdown in corpus],
+        "block_to_block_type": lambda: [block_to_block_type(block) for block in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(text) for text in inline_texts],
+        # Whole documents to node trees, including escaping text into leaf nodes
+        "to_html_node": lambda: [markdown_to_html_node(markdown) for markdown in corpus],
+        "to_html": lambda: [html_node.to_html() for html_node in html_nodes],
+        "template_splice": lambda: [template.render(title, html) for title, html in zip(titles, html_pages)],
+        "file_write": write_files,
+    }
+    results = {stage: time_stage(stages[stage], repeat) for stage in STAGES}
+    results["pages"] = len(corpus)
+    results["bytes"] = sum(len(markdown) for markdown in corpus)
+    return results
+
+def run_benchmarks(kinds, pages, size=4, seed=0, repeat=3):
+    results = {}
+    for kind in kinds:
+        corpus = make_corpus(kind, pages, size, seed)
+        results[kind] = bench_corpus(corpus, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pages": pages,
+            "size": size,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+# Listing stages that got slower than the baseline by more than threshold
+def compare_results(baseline, current, threshold=0.10):
+    regressions = []
+    for kind, stages in current["results"].items():
+        base_stages = baseline["results"].get(kind)
+        if base_stages is None:
+            continue
+        for stage in STAGES:
+            base = base_stages.get(stage)
+            value = stages.get(stage)
+            if not base or value is None:
+                continue
+            ratio = value / base
+            if ratio > 1 + threshold:
+                regressions.append((kind, stage, base, value, ratio))
+    return regressions
+
+
+def print_results(report):
+    header = f"{'corpus':<12}" + "".join(f"{stage:>21}" for stage in STAGES)
+    print(header)
+    for kind, stages in report["results"].items():
+        row = f"{kind:<12}" + "".join(f"{stages[stage] * 1000:>19.2f}ms" for stage in STAGES)
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown to HTML pipeline")
+    parser.add_argument("--kinds", nargs="+", choices=sorted(CORPORA), default=list(CORPORA))
+    parser.add_argument("--pages", type=int, default=50, help="pages per corpus")
+    parser.add_argument("--size", type=int, default=4, help="blocks scale factor per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is kept")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.kinds, args.pages, args.size, args.seed, args.repeat)
+    print_results(report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, report, args.threshold)
+        for kind, stage, base, value, ratio in regressions:
+            print(f"REGRESSION {kind}/{stage}: {base * 1000:.2f}ms -> {value * 1000:.2f}ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+
+# In-memory LRU cache of rendered blocks. Shared disclaimers, navigation
+# lists and license paragraphs repeat byte for byte across pages; their
+# HTML is rendered once per process and reused. Keys are
+# (block type, basepath, highlighter name, block text), values the HTML
+# fragment.
+# Repeated blocks are small, so blocks longer than max_block_size
+# characters are never cached, and entries are evicted once the cached
+# block texts and fragments exceed max_chars together. This keeps the
+# cache from undoing the bounded memory of streamed pages.
+class BlockCache():
+    def __init__(self, max_entries=4096, max_block_size=1024, max_chars=2 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_block_size = max_block_size
+        self.max_chars = max_chars
+        self.entries = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Whether a block of these lines is small enough to be cached
+    def accepts(self, lines):
+        if self.max_entries <= 0:
+            return False
+        size = len(lines)
+        for line in lines:
+            size += len(line)
+            if size > self.max_block_size:
+                return False
+        return True
+
+    def get(self, key):
+        fragment = self.entries.get(key)
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return fragment
+
+    def put(self, key, fragment):
+        if self.max_entries <= 0:
+            return
+        old_fragment = self.entries.pop(key, None)
+        if old_fragment is not None:
+            self.chars -= entry_chars(key, old_fragment)
+        self.entries[key] = fragment
+        self.chars += entry_chars(key, fragment)
+        while len(self.entries) > self.max_entries or (self.chars > self.max_chars and len(self.entries) > 1):
+            old_key, old_fragment = self.entries.popitem(last=False)
+            self.chars -= entry_chars(old_key, old_fragment)
+
+    def clear(self):
+        self.entries.clear()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"BlockCache({len(self.entries)}/{self.max_entries} entries, {self.chars} chars, {self.hits} hits, {self.misses} misses)"
+
+# The block text is the last element of the key
+def entry_chars(key, fragment):
+    return len(key[-1]) + len(fragment)
@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+
+
+# Wall time and call counts per build stage, named event counters (cache
+# hits and misses), plus one record per page
+class BuildStats():
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.pages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name, seconds, count=1):
+        total = self.stages.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += count
+
+    # Folding in stage timings collected by a worker process
+    def merge_stages(self, stages):
+        for name, (seconds, count) in stages.items():
+            self.add_stage(name, seconds, count)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge_counters(self, counters):
+        for name, amount in counters.items():
+            self.count(name, amount)
+
+    def add_page(self, path, seconds, size, blocks=None):
+        self.add_stage("generate_page", seconds)
+        self.pages.append((seconds, str(path), size, blocks))
+
+    def slowest_pages(self, top=10):
+        return sorted(self.pages, reverse=True)[:top]
+
+    def report(self, top=10):
+        elapsed = time.perf_counter() - self.start
+        print(f"Build finished in {elapsed:.3f}s, {len(self.pages)} pages generated")
+        print(f"{'stage':<24}{'total':>12}{'count':>10}{'mean':>12}")
+        for name, (seconds, count) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            mean = seconds / count if count else 0
+            print(f"{name:<24}{seconds * 1000:>10.1f}ms{count:>10}{mean * 1000:>10.3f}ms")
+        for name, amount in sorted(self.counters.items()):
+            print(f"{name:<24}{amount:>12}")
+        if not self.pages:
+            return
+        print(f"Slowest {min(top, len(self.pages))} pages:")
+        for seconds, path, size, blocks in self.slowest_pages(top):
+            blocks = "-" if blocks is None else blocks
+            print(f" {seconds * 1000:>10.2f}ms {size:>10} bytes {blocks:>6} blocks  {path}")
+
+    def __repr__(self):
+        return f"BuildStats({len(self.stages)} stages, {len(self.pages)} pages)"
@@ -1,16 +1,132 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
+from manifest import hash_file, is_unchanged, remove_stale
 
-def copy_files(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+COPY_MODES = ("copy", "hardlink", "reflink")
+
+# ioctl request asking the filesystem to share the extents of another file
+FICLONE = 0x40049409
+
+
+# Syncing the static tree into the output directory. A file is skipped when
+# its size and mtime match the previous build or the destination. With
+# checksum=True only content hashes are compared (previous build, else the
+# destination's own hash), so edits that keep size and mtime are copied.
+# Files recorded in the manifest whose source is gone are removed.
+# With workers > 1 the copies run on a thread pool once all destination
+# directories exist, which hides per-file latency on slow disks.
+def copy_files(source_dir_path, dest_dir_path, manifest=None, mode="copy", checksum=False, workers=1):
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown copy mode: {mode}")
+    old_entries = manifest["static"] if manifest is not None else {}
+    dir_paths, files = scan_static(source_dir_path, dest_dir_path)
+    for dir_path in dir_paths:
+        os.makedirs(dir_path, exist_ok=True)
+
+    entries = {}
+    to_copy = []
+    for from_path, dest_path, stat in files:
+        if checksum:
+            fingerprint = hash_file(from_path)
+            unchanged = is_unchanged(old_entries, from_path, fingerprint) or same_hash(fingerprint, dest_path)
         else:
-            copy_files(from_path, dest_path)
\ No newline at end of file
+            fingerprint = f"{stat.st_size}:{stat.st_mtime_ns}"
+            unchanged = is_unchanged(old_entries, from_path, fingerprint) or same_stat(stat, dest_path)
+        entries[from_path] = [fingerprint, dest_path]
+        if not unchanged:
+            to_copy.append((from_path, dest_path))
+
+    if workers > 1 and len(to_copy) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first copy error, if any
+            list(executor.map(lambda paths: copy_file(*paths, mode), to_copy))
+    else:
+        for from_path, dest_path in to_copy:
+            copy_file(from_path, dest_path, mode)
+
+    removed = 0
+    if manifest is not None:
+        removed = remove_stale(old_entries, entries, verbose=False)
+        manifest["static"] = entries
+    print(f"Static files: {len(to_copy)} copied, {len(files) - len(to_copy)} unchanged, {removed} removed")
+
+
+# Walking the source tree with os.scandir. Returns the destination
+# directories in creation order and (source, destination, stat) per file.
+def scan_static(source_dir_path, dest_dir_path):
+    dir_paths = [dest_dir_path]
+    files = []
+    pending = [(source_dir_path, dest_dir_path)]
+    while pending:
+        from_dir, dest_dir = pending.pop()
+        subdirs = []
+        with os.scandir(from_dir) as entries:
+            for entry in entries:
+                dest_path = os.path.join(dest_dir, entry.name)
+                if entry.is_dir():
+                    subdirs.append((entry.path, dest_path))
+                else:
+                    files.append((entry.path, dest_path, entry.stat()))
+        for from_path, dest_path in sorted(subdirs, reverse=True):
+            dir_paths.append(dest_path)
+            pending.append((from_path, dest_path))
+    return dir_paths, files
+
+
+def same_hash(file_hash, dest_path):
+    return os.path.exists(dest_path) and hash_file(dest_path) == file_hash
+
+def same_stat(stat, dest_path):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_size == stat.st_size and dest_stat.st_mtime_ns == stat.st_mtime_ns
+
+
+def copy_file(from_path, dest_path, mode="copy"):
+    if os.path.lexists(dest_path):
+        # Never write through an old hard link back into the source tree
+        os.remove(dest_path)
+    if mode == "hardlink":
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            pass
+    elif mode == "reflink":
+        if clone_file(from_path, dest_path):
+            shutil.copystat(from_path, dest_path)
+            return
+    shutil.copy2(from_path, dest_path)
+
+
+# Copy-on-write clone with FICLONE, falling back to copy_file_range so the
+# bytes at least stay in the kernel. Returns False if neither is available.
+def clone_file(from_path, dest_path):
+    with open(from_path, "rb") as source, open(dest_path, "wb") as dest:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+                return True
+            except OSError:
+                pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(source.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(source.fileno(), dest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                return remaining == 0
+            except OSError:
+                pass
+    return False
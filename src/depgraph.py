@@ -0,0 +1,80 @@
+import json
+import os
+from urllib.parse import urlsplit
+
+from inline_markdown import extract_markdown_images, extract_markdown_links
+from manifest import save_json
+
+DEPS_NAME = ".deps.json"
+
+
+# Which outputs depend on which inputs: every page on its markdown source and
+# the template, plus the images and links its markdown references. Pages
+# also keep their metadata (title, source mtime), from which the site
+# indexes are built without reading content/ again.
+# Site paths ("images/tom.png") are URLs without scheme, host, query and the
+# leading slash, so they compare equal to paths inside static/ and content/.
+class DependencyGraph():
+    def __init__(self, pages=None):
+        # source path -> {"output", "template", "images", "links", "meta"}
+        self.pages = pages if pages is not None else {}
+
+    def record_page(self, from_path, dest_path, template_path, images, links, meta=None):
+        self.pages[from_path] = {
+            "output": str(dest_path),
+            "template": template_path,
+            "images": sorted(set(images)),
+            "links": sorted(set(links)),
+            "meta": meta,
+        }
+
+    def remove_page(self, from_path):
+        self.pages.pop(from_path, None)
+
+    def prune(self, from_paths):
+        for from_path in list(self.pages):
+            if from_path not in from_paths:
+                del self.pages[from_path]
+
+    # Pages referencing a site path, or any file with that name ("rivendell.png")
+    def pages_using(self, name):
+        name = site_path(name)
+        matches = []
+        for path, page in self.pages.items():
+            for reference in page["images"] + page["links"]:
+                if reference == name or reference.endswith("/" + name):
+                    matches.append(path)
+                    break
+        return sorted(matches)
+
+    def save(self, dest_dir_path):
+        os.makedirs(dest_dir_path, exist_ok=True)
+        save_json(os.path.join(dest_dir_path, DEPS_NAME), self.pages)
+
+    def __repr__(self):
+        return f"DependencyGraph({len(self.pages)} pages)"
+
+
+def load_graph(dest_dir_path):
+    deps_path = os.path.join(dest_dir_path, DEPS_NAME)
+    if not os.path.exists(deps_path):
+        return DependencyGraph()
+    with open(deps_path, "r") as file:
+        return DependencyGraph(json.load(file))
+
+
+# Image and link targets of a markdown document, as site paths.
+# External URLs are kept as given.
+def page_references(markdown):
+    images = [site_path(url) for _, url in extract_markdown_images(markdown)]
+    links = [site_path(url) for _, url in extract_markdown_links(markdown)]
+    return images, links
+
+def block_references(lines):
+    return page_references("\n".join(lines))
+
+def site_path(url):
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        return url
+    return parts.path.lstrip("/")
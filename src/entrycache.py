@@ -0,0 +1,60 @@
+import json
+import os
+
+from manifest import save_json
+
+
+# Directory of small JSON entries named by a hex digest and sharded by its
+# first two characters. Entries are written through manifest.save_json (a
+# temporary file renamed into place), so builds sharing the directory never
+# read half an entry; racing writers store identical bytes. File mtimes
+# double as the LRU clock of prune().
+class EntryCache():
+    def __init__(self, cache_dir, max_entries=10000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    # The stored dict, or None for a missing or unreadable entry
+    def read_entry(self, key):
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def write_entry(self, key, entry):
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        save_json(entry_path, entry)
+
+    # Evicting the least recently used entries beyond max_entries
+    def prune(self):
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        for _, entry_path in entries[:excess]:
+            os.remove(entry_path)
+        return excess
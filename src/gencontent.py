@@ -1,48 +1,549 @@
+import io
 import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from itertools import chain, repeat
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
+from markdown_blocks import markdown_to_html_node, iter_blocks, iter_blocks_html
+from manifest import hash_bytes, hash_file, is_unchanged, remove_stale, write_if_changed
+from pagetemplate import load_template
+from blockcache import BlockCache
+from buildstats import BuildStats
+from highlight import highlighter_name
+from textnode import URLContext, escape_text
+from depgraph import DependencyGraph, page_references, block_references
+from shard import in_shard
+from siteindex import write_site_indexes
 
-def generate_page_all(basepath, dir_path_content, template_path, dest_dir_path):
+# What a worker process sends back for one page
+RenderedPage = namedtuple(
+    "RenderedPage",
+    ["log", "title", "html", "size", "blocks", "stages", "counters", "seconds", "references", "front_matter"],
+)
+# Rendered blocks shared by all pages built in this process, or None when
+# the cache is turned off
+BLOCK_CACHE = BlockCache()
+# Front matter and title of a page, read without touching the body
+PageHeader = namedtuple("PageHeader", ["front_matter", "title"])
+FRONT_MATTER_FENCE = "---"
+# Reader threads and the number of pages in flight per stage of the
+# pipelined build
+PipelineOptions = namedtuple("PipelineOptions", ["readers", "depth"])
+
+# With shard=(index, count) only that part of the content tree is rendered.
+# With indexes (siteindex.IndexOptions) the blog listing, sitemap and feed
+# are written afterwards from the metadata recorded while rendering.
+# With drafts=False, pages whose front matter says "draft: true" are left out.
+def generate_page_all(basepath, dir_path_content, template_path, dest_dir_path, manifest=None, jobs=1, parse_cache=None, stats=None, deps=None, shard=None, pipeline=None, indexes=None, drafts=True, highlighter=None):
+    if indexes is not None and deps is None:
+        deps = DependencyGraph()
+    if manifest is None:
+        pages = list(find_shard_pages(dir_path_content, dest_dir_path, shard, drafts))
+        written = generate_pages(basepath, pages, template_path, jobs, parse_cache, stats, deps, pipeline, highlighter)
+        if deps is not None:
+            deps.prune({from_path for from_path, _ in pages})
+        print(f"Pages: {written} written, {len(pages) - written} unchanged, 0 removed")
+        if indexes is not None:
+            write_site_indexes(deps, basepath, dir_path_content, template_path, dest_dir_path, indexes)
+        return
+
+    # A changed template (or basepath) means every page using it has to be rebuilt
+    template_hash = hash_file(template_path)
+    template_changed = manifest["template"] != template_hash
+
+    entries = {}
+    pages = []
+    for from_path, dest_path in find_shard_pages(dir_path_content, dest_dir_path, shard):
+        with open(from_path, "rb") as file:
+            source = file.read()
+        # Drafts are recognized from the bytes read for the hash
+        if not drafts and source_is_draft(source):
+            continue
+        page_hash = hash_bytes(source)
+        entries[from_path] = [page_hash, str(dest_path)]
+        if not is_unchanged(manifest["pages"], from_path, page_hash):
+            pages.append((from_path, dest_path))
+        elif template_changed and uses_template(deps, from_path, template_path):
+            pages.append((from_path, dest_path))
+        elif indexes is not None and not has_meta(deps, from_path):
+            pages.append((from_path, dest_path))
+    written = generate_pages(basepath, pages, template_path, jobs, parse_cache, stats, deps, pipeline, highlighter)
+
+    if deps is not None:
+        deps.prune(entries)
+    removed = remove_stale(manifest["pages"], entries)
+    manifest["pages"] = entries
+    manifest["template"] = template_hash
+    print(f"Pages: {written} written, {len(entries) - written} unchanged, {removed} removed")
+    if indexes is not None:
+        write_site_indexes(deps, basepath, dir_path_content, template_path, dest_dir_path, indexes, manifest)
+
+# Turning the block cache of this process on or off. Process pools run it
+# in every worker, so workers follow the parent.
+def use_block_cache(enabled):
+    global BLOCK_CACHE
+    if not enabled:
+        BLOCK_CACHE = None
+    elif BLOCK_CACHE is None:
+        BLOCK_CACHE = BlockCache()
+
+# Pages missing from the dependency graph are assumed to use the template
+def uses_template(deps, from_path, template_path):
+    if deps is None or from_path not in deps.pages:
+        return True
+    return deps.pages[from_path]["template"] == template_path
+
+# Graphs written before page metadata was recorded lack it
+def has_meta(deps, from_path):
+    return deps is not None and deps.pages.get(from_path, {}).get("meta") is not None
+
+# Metadata the site indexes are built from. A front matter date replaces
+# the file's mtime (naive dates are taken as UTC).
+def page_meta(from_path, title, front_matter=None):
+    front_matter = front_matter or {}
+    meta = {"title": title, "updated": os.path.getmtime(from_path)}
+    if "date" in front_matter:
+        try:
+            date = datetime.fromisoformat(str(front_matter["date"]))
+        except ValueError:
+            raise ValueError(f"invalid date in {from_path}: {front_matter['date']}")
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        meta["updated"] = date.timestamp()
+    if "tags" in front_matter:
+        tags = front_matter["tags"]
+        meta["tags"] = [str(tag) for tag in (tags if isinstance(tags, list) else [tags])]
+    if front_matter.get("author"):
+        meta["author"] = str(front_matter["author"])
+    return meta
+
+# Collecting (source, destination) pairs of the content tree
+def find_pages(dir_path_content, dest_dir_path):
     for filename in os.listdir(dir_path_content):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
         if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(basepath, from_path, template_path, dest_path)
+            yield from_path, Path(dest_path).with_suffix(".html")
         else:
-            generate_page_all(basepath, from_path, template_path, dest_path)
+            yield from find_pages(from_path, dest_path)
+
+def find_shard_pages(dir_path_content, dest_dir_path, shard=None, drafts=True):
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        if not in_shard(from_path, dir_path_content, shard):
+            continue
+        if not drafts and is_draft(from_path):
+            continue
+        yield from_path, dest_path
+
+# Only the front matter is read, or just the first line without one
+def is_draft(from_path):
+    with open(from_path, "r") as file:
+        return has_draft_flag(file)
+
+# Same check on a page already read into memory, decoding only its header
+def source_is_draft(source):
+    return has_draft_flag(io.TextIOWrapper(io.BytesIO(source)))
+
+def has_draft_flag(lines):
+    front_matter, _ = split_front_matter_lines(lines)
+    return front_matter.get("draft") is True
 
-# Generating page with template
-def generate_page(basepath, from_path, template_path, dest_path):
+# Rendering a list of (source, destination) pairs, optionally across
+# processes or through the read/render/write pipeline. Returns how many
+# output files actually changed.
+def generate_pages(basepath, pages, template_path, jobs=1, parse_cache=None, stats=None, deps=None, pipeline=None, highlighter=None):
+    if not pages:
+        return 0
+    template = load_template(template_path, basepath)
+    if pipeline is not None:
+        return generate_pages_pipelined(basepath, pages, template_path, template, jobs, parse_cache, stats, deps, pipeline, highlighter)
+    written = 0
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, dest_path in pages:
+            written += generate_page(basepath, from_path, template_path, dest_path, template, parse_cache, stats, deps, highlighter)
+        return written
+
+    from_paths = [from_path for from_path, _ in pages]
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=use_block_cache, initargs=(BLOCK_CACHE is not None,)) as executor:
+        # map() yields results in submission order, which keeps the log deterministic
+        results = executor.map(
+            render_page,
+            from_paths,
+            repeat(basepath),
+            repeat(parse_cache),
+            repeat(stats is not None),
+            repeat(highlighter),
+            chunksize=chunksize,
+        )
+        for (from_path, dest_path), page in zip(pages, results):
+            print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+            print(page.log, end="")
+            written += write_rendered_page(template, template_path, from_path, dest_path, page, stats, deps)
+    return written
+
+# Writing a page rendered by render_page and recording it
+def write_rendered_page(template, template_path, from_path, dest_path, page, stats=None, deps=None):
+    start = time.perf_counter()
+    written = write_page(template, page.title, [page.html], dest_path, stats)
+    if stats is not None:
+        stats.merge_stages(page.stages)
+        stats.merge_counters(page.counters)
+        seconds = page.seconds + time.perf_counter() - start
+        stats.add_page(from_path, seconds, page.size, page.blocks)
+    if deps is not None:
+        deps.record_page(from_path, dest_path, template_path, *page.references, page_meta(from_path, page.title, page.front_matter))
+    return written
+
+# Pipelined build: reader threads prefetch markdown files, pages are
+# rendered here or on a process pool (jobs > 1), and a writer thread
+# flushes finished pages. Each stage holds at most `depth` pages, so
+# slow reads and writes overlap with rendering without unbounded memory.
+def generate_pages_pipelined(basepath, pages, template_path, template, jobs, parse_cache, stats, deps, options, highlighter=None):
+    write_queue = queue.Queue(maxsize=options.depth)
+    writer = PageWriter(template, template_path, write_queue, stats, deps)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=options.readers) as read_pool:
+            sources = bounded_map(read_pool, read_source, ((from_path,) for from_path, _ in pages), options.depth)
+            render_args = ((markdown, basepath, parse_cache, stats is not None, highlighter) for markdown in sources)
+            if jobs > 1:
+                with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=use_block_cache, initargs=(BLOCK_CACHE is not None,)
+                ) as render_pool:
+                    rendered = bounded_map(render_pool, render_source, render_args, options.depth)
+                    queue_pages(pages, rendered, template_path, write_queue)
+            else:
+                rendered = (render_source(*args) for args in render_args)
+                queue_pages(pages, rendered, template_path, write_queue)
+    finally:
+        # The writer drains everything queued so far, then stops
+        write_queue.put(None)
+        writer.join()
+    if writer.error is not None:
+        raise writer.error
+    return writer.written
+
+def queue_pages(pages, rendered, template_path, write_queue):
+    for (from_path, dest_path), page in zip(pages, rendered):
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+        print(page.log, end="")
+        write_queue.put((from_path, dest_path, page))
+
+# Submitting func(*args) for each item while keeping at most `depth`
+# calls in flight, yielding results in submission order
+def bounded_map(executor, func, args_iter, depth):
+    pending = deque()
+    for args in args_iter:
+        pending.append(executor.submit(func, *args))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Writer stage of the pipeline. It owns stats and deps while running.
+# After an error it keeps draining the queue, so the producer never
+# blocks on a full queue; the error is raised once the pipeline stops.
+class PageWriter(threading.Thread):
+    def __init__(self, template, template_path, write_queue, stats=None, deps=None):
+        super().__init__(name="page-writer", daemon=True)
+        self.template = template
+        self.template_path = template_path
+        self.write_queue = write_queue
+        self.stats = stats
+        self.deps = deps
+        self.written = 0
+        self.error = None
+
+    def run(self):
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            from_path, dest_path, page = item
+            try:
+                self.written += write_rendered_page(
+                    self.template, self.template_path, from_path, dest_path, page, self.stats, self.deps
+                )
+            except Exception as error:
+                self.error = error
+
+def read_source(from_path):
+    with open(from_path, "r") as file:
+        return file.read()
+
+def render_page(from_path, basepath, parse_cache=None, with_stats=False, highlighter=None):
+    return render_source(read_source(from_path), basepath, parse_cache, with_stats, highlighter)
+
+# Worker side of the parallel build: parse and render one markdown document.
+# Output printed while rendering is captured and replayed by the parent.
+def render_source(markdown_content, basepath, parse_cache=None, with_stats=False, highlighter=None):
+    start = time.perf_counter()
+    stats = BuildStats() if with_stats else None
+    log = io.StringIO()
+    with redirect_stdout(log):
+        title, fragments, blocks, front_matter = render_markdown(markdown_content, basepath, parse_cache, stats, highlighter)
+        html_content = "".join(fragments)
+    return RenderedPage(
+        log.getvalue(),
+        title,
+        html_content,
+        len(markdown_content.encode()),
+        blocks,
+        stats.stages if stats is not None else None,
+        stats.counters if stats is not None else None,
+        time.perf_counter() - start,
+        page_references(markdown_content),
+        front_matter,
+    )
+
+# Generating page with template, returning whether the output changed
+def generate_page(basepath, from_path, template_path, dest_path, template=None, parse_cache=None, stats=None, deps=None, highlighter=None):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    start = time.perf_counter()
+    if template is None:
+        template = load_template(template_path, basepath)
+
+    if parse_cache is None:
+        return stream_page(basepath, from_path, template_path, dest_path, template, stats, deps, highlighter)
 
-    with open(template_path, "r") as file:
-        template_content = file.read()
-    
     with open(from_path, "r") as file:
         markdown_content = file.read()
 
-    html_content = markdown_to_html_node(markdown_content).to_html()
-    title = extract_title(markdown_content)
-    final_html = template_content.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
+    title, fragments, blocks, front_matter = render_markdown(markdown_content, basepath, parse_cache, stats, highlighter)
+    written = write_page(template, title, fragments, dest_path, stats)
 
-    final_html = final_html.replace('href="/', f'href="{basepath}')
-    final_html = final_html.replace('src="/', f'src="{basepath}')
+    if stats is not None:
+        stats.add_page(from_path, time.perf_counter() - start, len(markdown_content.encode()), blocks)
+    if deps is not None:
+        deps.record_page(from_path, dest_path, template_path, *page_references(markdown_content), page_meta(from_path, title, front_matter))
+    return written
 
+# Rendering straight from the open markdown file into the output file, one
+# block at a time, so the document is never held in memory as a whole. The
+# file is opened once: lines read while looking for the title are kept and
+# rendered ahead of the rest.
+def stream_page(basepath, from_path, template_path, dest_path, template, stats=None, deps=None, highlighter=None):
+    start = time.perf_counter()
+    images = []
+    links = []
+    block_count = 0
+
+    def observed_blocks(blocks):
+        nonlocal block_count
+        for block_type, lines in blocks:
+            block_count += 1
+            if deps is not None:
+                block_images, block_links = block_references(lines)
+                images.extend(block_images)
+                links.extend(block_links)
+            yield block_type, lines
+
+    with open(from_path, "r") as file:
+        front_matter, body = split_front_matter_lines(file)
+        head = []
+        title = extract_page_title(front_matter, kept_lines(body, head))
+        blocks = observed_blocks(iter_blocks(chain(head, body)))
+        cache_state = block_cache_state()
+        fragments = iter_blocks_html(blocks, URLContext(basepath), BLOCK_CACHE, highlighter)
+        written = write_page(template, title, fragments, dest_path, stats, "markdown_to_html_node")
+        count_block_cache(stats, cache_state)
+
+    if stats is not None:
+        stats.add_page(from_path, time.perf_counter() - start, os.path.getsize(from_path), block_count)
+    if deps is not None:
+        deps.record_page(from_path, dest_path, template_path, images, links, page_meta(from_path, title, front_matter))
+    return written
+
+# Yielding lines while appending them to kept
+def kept_lines(lines, kept):
+    for line in lines:
+        kept.append(line)
+        yield line
+
+# Returning the title, the HTML fragments, the block count and the front
+# matter of a markdown document (the count is None for documents served
+# from the parse cache)
+def render_markdown(markdown_content, basepath, parse_cache=None, stats=None, highlighter=None):
+    front_matter, body = split_front_matter(markdown_content)
+    if parse_cache is None:
+        html_node = parse_markdown(body, basepath, stats, highlighter)
+        title = extract_page_title(front_matter, body.split("\n"))
+        return title, html_node.iter_html(), len(html_node.children), front_matter
+
+    key = parse_cache.key(markdown_content, basepath, highlighter_name(highlighter))
+    cached = parse_cache.get(key)
+    if cached is not None:
+        title, html_content = cached
+        print(f"Cached: Found title {title}")
+        return title, [html_content], None, front_matter
+
+    html_node = parse_markdown(body, basepath, stats, highlighter)
+    html_content = html_node.to_html()
+    title = extract_page_title(front_matter, body.split("\n"))
+    parse_cache.put(key, title, html_content)
+    return title, [html_content], len(html_node.children), front_matter
+
+def parse_markdown(markdown_content, basepath, stats=None, highlighter=None):
+    if stats is None:
+        return markdown_to_html_node(markdown_content, URLContext(basepath), BLOCK_CACHE, highlighter)
+    cache_state = block_cache_state()
+    with stats.stage("markdown_to_html_node"):
+        html_node = markdown_to_html_node(markdown_content, URLContext(basepath), BLOCK_CACHE, highlighter)
+    count_block_cache(stats, cache_state)
+    return html_node
+
+def block_cache_state():
+    if BLOCK_CACHE is None:
+        return None
+    return BLOCK_CACHE.hits, BLOCK_CACHE.misses
+
+# Adding the block cache lookups made since cache_state was taken to stats
+def count_block_cache(stats, cache_state):
+    if stats is None or cache_state is None or BLOCK_CACHE is None:
+        return
+    hits, misses = cache_state
+    stats.count("block_cache_hits", BLOCK_CACHE.hits - hits)
+    stats.count("block_cache_misses", BLOCK_CACHE.misses - misses)
+
+# Streaming the content fragments into the compiled template
+# (serialising the node tree happens here when it is streamed).
+# The page is written next to dest_path and only replaces it when the
+# bytes differ, so unchanged pages keep their mtime and a failed render
+# never leaves a truncated file. Returns whether dest_path changed.
+# With render_stage, the time spent producing fragments (parsing and
+# rendering streamed blocks) is recorded under that stage instead.
+def write_page(template, title, fragments, dest_path, stats=None, render_stage=None):
+    start = time.perf_counter()
+    render_seconds = [0.0]
+    if stats is not None and render_stage is not None:
+        fragments = timed_iter(fragments, render_seconds)
     dest_dir_path = os.path.dirname(dest_path)
     if dest_dir_path != "":
         os.makedirs(dest_dir_path, exist_ok=True)
 
-    with open(dest_path, "w") as file:
-        file.write(final_html)
+    written = write_if_changed(dest_path, lambda file: template.write(file, title, fragments))
+
+    if stats is not None:
+        if render_stage is not None:
+            stats.add_stage(render_stage, render_seconds[0])
+        stats.add_stage("write_page", time.perf_counter() - start - render_seconds[0])
+    return written
+
+# Yielding from items while adding the time spent in next() to seconds[0]
+def timed_iter(items, seconds):
+    items = iter(items)
+    while True:
+        start = time.perf_counter()
+        item = next(items, None)
+        seconds[0] += time.perf_counter() - start
+        if item is None:
+            return
+        yield item
 
 # Extracting title
 def extract_title(markdown):
-    lines = markdown.split("\n")
+    return extract_title_from_lines(markdown.split("\n"))
+
+# Stops at the first title, so only the head of an open file is read.
+# Titles are returned escaped for HTML, the form every output uses.
+def extract_title_from_lines(lines):
+    title = first_heading(lines)
+    if title is None:
+        raise Exception("Error: Header is missing.")
+    print(f"Success: Found title {title}")
+    return escape_text(title)
+
+def first_heading(lines):
     for line in lines:
         stripped_line = line.strip()
         if stripped_line.startswith("# "):
-            print(f"Success: Found title {stripped_line.lstrip("#").strip()}")
             return stripped_line.lstrip("#").strip()
-    raise Exception("Error: Header is missing.")
+    return None
+
+# A "title" in the front matter takes precedence over the first heading
+def extract_page_title(front_matter, lines):
+    if front_matter.get("title"):
+        title = str(front_matter["title"])
+        print(f"Success: Found title {title}")
+        return escape_text(title)
+    return extract_title_from_lines(lines)
+
+# Metadata-only read: the front matter and the first heading. The body is
+# read only as far as that heading, and not at all with a front matter title.
+def read_page_header(from_path):
+    with open(from_path, "r") as file:
+        front_matter, body = split_front_matter_lines(file)
+        title = front_matter.get("title")
+        if not title:
+            title = first_heading(body)
+    return PageHeader(front_matter, None if title is None else str(title))
+
+# Front matter is a block of "key: value" lines between two "---" lines at
+# the top of a page. Values are strings, true/false, or lists written as
+# "[a, b]" or as "- item" lines below an empty key. Returns the fields and
+# the remaining lines of the body.
+def split_front_matter_lines(lines):
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or not is_fence(first):
+        return {}, lines if first is None else chain([first], lines)
+    header = [first]
+    for line in lines:
+        header.append(line)
+        if is_fence(line):
+            return parse_front_matter(header[1:-1]), lines
+    # No closing fence: the "---" was part of the body
+    return {}, iter(header)
+
+# Same result as split_front_matter_lines on the lines of a string
+def split_front_matter(markdown):
+    end = markdown.find("\n")
+    if not is_fence(markdown if end == -1 else markdown[:end]):
+        return {}, markdown
+    front_matter, body = split_front_matter_lines(markdown.split("\n"))
+    return front_matter, "\n".join(body)
+
+# Surrounding whitespace is ignored, as for the "key: value" lines
+def is_fence(line):
+    return line.strip() == FRONT_MATTER_FENCE
+
+def parse_front_matter(lines):
+    fields = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(fields[key], list):
+                fields[key] = []
+            fields[key].append(parse_front_matter_value(stripped[2:]))
+            continue
+        name, separator, value = stripped.partition(":")
+        if not separator:
+            raise ValueError(f"invalid front matter line: {stripped}")
+        key = name.strip()
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            fields[key] = [parse_front_matter_value(item) for item in value[1:-1].split(",") if item.strip()]
+        else:
+            fields[key] = parse_front_matter_value(value)
+    return fields
 
+def parse_front_matter_value(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in ("true", "yes"):
+        return True
+    if value.lower() in ("false", "no"):
+        return False
+    return value
@@ -0,0 +1,85 @@
+import hashlib
+
+from entrycache import EntryCache
+
+try:
+    import pygments
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    pygments = None
+
+# Bumped when the cached output format changes
+HIGHLIGHT_VERSION = 1
+
+
+# A highlighter turns the code of a fenced block into the HTML placed inside
+# <code class="language-x">, or returns None for languages it does not
+# know (the block is then rendered as plain text). Highlighters are sent to
+# worker processes, so they must pickle; `name` identifies their output in
+# cache keys.
+class PygmentsHighlighter():
+    def __init__(self):
+        if pygments is None:
+            raise ValueError("Syntax highlighting with pygments needs the pygments package")
+        self.name = f"pygments-{pygments.__version__}"
+        self.formatter = None
+
+    def highlight(self, language, code):
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            return None
+        if self.formatter is None:
+            self.formatter = HtmlFormatter(nowrap=True)
+        return pygments.highlight(code, lexer, self.formatter)
+
+    def __getstate__(self):
+        return {"name": self.name, "formatter": None}
+
+    def __repr__(self):
+        return f"PygmentsHighlighter({self.name})"
+
+HIGHLIGHTERS = {"pygments": PygmentsHighlighter}
+
+# "auto" uses pygments when it is installed and plain code blocks otherwise.
+# The default is no highlighting, so output never depends on what happens
+# to be installed.
+def make_highlighter(name="none"):
+    if name == "none" or (name == "auto" and pygments is None):
+        return None
+    if name == "auto":
+        name = "pygments"
+    return HIGHLIGHTERS[name]()
+
+
+# On-disk cache in front of a highlighter, keyed by the highlighter, the
+# language and a hash of the code; pruned like the parse cache.
+class HighlightCache(EntryCache):
+    def __init__(self, highlighter, cache_dir, max_entries=10000):
+        super().__init__(cache_dir, max_entries)
+        self.highlighter = highlighter
+        self.name = highlighter.name
+
+    def key(self, language, code):
+        digest = hashlib.sha256()
+        digest.update(f"{HIGHLIGHT_VERSION}\0{self.name}\0{language}\0".encode())
+        digest.update(code.encode())
+        return digest.hexdigest()
+
+    def highlight(self, language, code):
+        key = self.key(language, code)
+        entry = self.read_entry(key)
+        if entry is not None and "html" in entry:
+            return entry["html"]
+        html = self.highlighter.highlight(language, code)
+        self.write_entry(key, {"html": html})
+        return html
+
+    def __repr__(self):
+        return f"HighlightCache({self.cache_dir}, {self.name})"
+
+# Identifies what a highlighter produces, for keys of caches holding pages
+def highlighter_name(highlighter):
+    return "" if highlighter is None else highlighter.name
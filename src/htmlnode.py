@@ -1,6 +1,9 @@
 
 
 class HTMLNode():
+    # Slots instead of a per-instance __dict__: a build allocates a node per inline span
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -9,7 +12,15 @@ class HTMLNode():
         
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
+
+    # Yielding the HTML in fragments instead of one concatenated string
+    def iter_html(self):
+        yield self.to_html()
+
+    def write(self, fp):
+        fp.writelines(self.iter_html())
     
+    # Prop values are inserted as they are: escape them before building the node
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -22,7 +33,10 @@ class HTMLNode():
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
     
 
+# The value is HTML (text_node_to_html_node escapes text on the way in)
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -37,18 +51,23 @@ class LeafNode(HTMLNode):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         if self.tag == "" or self.tag is None:
             raise ValueError("Parent nodes must have tag")
         if self.children == "" or self.children is None:
             raise ValueError("Parent nodes must have a children")
-        children_html = ""
+        yield f"<{self.tag}{self.props_to_html()}>"
         for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
     
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"    
\ No newline at end of file
@@ -2,16 +2,88 @@ import re
 from textnode import TextNode, TextType
 
 
+# Openers for delimited spans, then complete images and links
+INLINE_PATTERN = re.compile(
+    r"(\*\*|_|`)"
+    r"|!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|\[([^\[\]]*)\]\(([^\(\)]*)\)"
+)
+DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+UNCLOSED_IMAGE_PATTERN = re.compile(r"!\[[^]]*\]\([^)]*$")
+UNCLOSED_LINK_PATTERN = re.compile(r"(?<!\!)\[[^]]*\]\([^)]*$")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    return tokenize_inline(text)
+
+
+# Single left-to-right pass. Text inside a span is taken literally, which
+# differs from splitting the whole text once per delimiter: `a_b` is code,
+# "_" in link and image URLs or alt texts is kept, and "_a **b** c_" is one
+# italic span instead of an error.
+# Unclosed images and links are reported on the same text as in the chained
+# passes: images between delimited spans, links between delimited spans and
+# images. Text in front of a complete link is not checked on its own, so
+# "[a]([[x](u)b c" is text, link, text.
+def tokenize_inline(text):
+    nodes = []
+    pos = 0
+    # Where the text the image and link passes would have checked begins
+    image_start = link_start = 0
+    # Without a "](" nothing can be unclosed
+    check = "](" in text
+    while True:
+        match = INLINE_PATTERN.search(text, pos)
+        if match is None:
+            break
+        if match.start() > pos:
+            nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+        delimiter = match.group(1)
+        if delimiter is not None:
+            if check:
+                check_unclosed(text, image_start, link_start, match.start())
+            start = match.end()
+            end = text.find(delimiter, start)
+            if end == -1:
+                raise ValueError("invalid markdown, formatted section not closed")
+            if end > start:
+                nodes.append(TextNode(text[start:end], DELIMITER_TYPES[delimiter]))
+            pos = image_start = link_start = end + len(delimiter)
+        elif match.group(2) is not None:
+            if check:
+                check_unclosed(text, None, link_start, match.start())
+            nodes.append(TextNode(match.group(2), TextType.IMAGE, match.group(3)))
+            pos = link_start = match.end()
+        else:
+            nodes.append(TextNode(match.group(4), TextType.LINK, match.group(5)))
+            pos = match.end()
+    if check:
+        check_unclosed(text, image_start, link_start, len(text))
+    if pos < len(text):
+        nodes.append(TextNode(text[pos:], TextType.TEXT))
     return nodes
 
 
+# Raising for an image opened in text[image_start:end] or a link opened in
+# text[link_start:end] that runs to end without its closing parenthesis
+def check_unclosed(text, image_start, link_start, end):
+    start = link_start if image_start is None else min(image_start, link_start)
+    # Both need a "](" with no ")" after it; if the last one has one, all do
+    opener = text.rfind("](", start, end)
+    if opener == -1 or text.find(")", opener, end) != -1:
+        return
+    if image_start is not None and UNCLOSED_IMAGE_PATTERN.search(text, image_start, end):
+        raise ValueError("invalid markdown, image section not closed")
+    if UNCLOSED_LINK_PATTERN.search(text, link_start, end):
+        raise ValueError("invalid markdown, link section not closed")
+
+
 def split_nodes_image(old_nodes):
     new_nodes = []
     for old_node in old_nodes:
@@ -19,7 +91,7 @@ def split_nodes_image(old_nodes):
             new_nodes.append(old_node)
             continue
         original_text = old_node.text
-        if re.search(r"!\[[^]]*\]\([^)]*$", original_text):
+        if UNCLOSED_IMAGE_PATTERN.search(original_text):
             raise ValueError("invalid markdown, image section not closed")
         images = extract_markdown_images(original_text)
         if len(images) == 0:
@@ -50,7 +122,7 @@ def split_nodes_link(old_nodes):
             new_nodes.append(old_node)
             continue
         original_text = old_node.text
-        if re.search(r"(?<!\!)\[[^]]*\]\([^)]*$", original_text):
+        if UNCLOSED_LINK_PATTERN.search(original_text):
             raise ValueError("invalid markdown, link section not closed")
         links = extract_markdown_links(original_text)
         if len(links) == 0:
@@ -92,7 +164,7 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
\ No newline at end of file
+    return LINK_PATTERN.findall(text)
\ No newline at end of file
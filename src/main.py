@@ -1,28 +1,450 @@
 import os
-import shutil
-from copystatic import copy_files
-from gencontent import generate_page_all
 import sys
+import argparse
+
+# Only the standard library is imported up front. Parser, renderer and
+# copy modules are imported by the commands that need them, so --help and
+# clean do not pay for loading the build pipeline.
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
 template_path = "./template.html"
 
-if len(sys.argv) > 1:
-    basepath = sys.argv[1]
-else:
-    basepath = "/"
+COMMANDS = ("build", "watch", "bench", "clean", "list")
+# Same as copystatic.COPY_MODES, repeated to keep copystatic out of startup
+LINK_MODES = ("copy", "hardlink", "reflink")
+# highlight.HIGHLIGHTERS plus "auto" and "none", for the same reason
+HIGHLIGHT_MODES = ("auto", "pygments", "none")
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # "main.py /basepath/" without a command keeps meaning a build
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["build"] + list(argv)
+    parser = make_parser()
+    # bench hands everything after it to benchmark.py's own parser
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.run(args) or 0
+
+def make_parser():
+    parser = argparse.ArgumentParser(description="Static site generator")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    build_parser = commands.add_parser("build", help="build the site (default)")
+    add_build_arguments(build_parser)
+    build_parser.add_argument(
+        "--uses",
+        metavar="NAME",
+        help="list the pages of the last build that reference NAME (e.g. rivendell.png) and exit",
+    )
+    build_parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="SHARD_DIR",
+        help="combine shard output directories into the output directory and exit",
+    )
+    build_parser.set_defaults(run=run_build)
+
+    watch_parser = commands.add_parser("watch", help="build, serve the site and rebuild changed sources on save")
+    add_build_arguments(watch_parser)
+    watch_parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="port of the development server",
+    )
+    watch_parser.set_defaults(run=run_watch)
+
+    bench_parser = commands.add_parser("bench", help="benchmark the markdown pipeline (see bench --help)", add_help=False)
+    bench_parser.set_defaults(run=run_bench)
+
+    clean_parser = commands.add_parser("clean", help="delete the output directory and the parse cache")
+    clean_parser.add_argument(
+        "-o",
+        "--output",
+        default=dir_path_public,
+        metavar="DIR",
+        help="directory the site is written to",
+    )
+    clean_parser.add_argument(
+        "--parse-cache",
+        metavar="DIR",
+        help="parse cache directory to delete as well",
+    )
+    clean_parser.add_argument(
+        "--highlight-cache",
+        metavar="DIR",
+        help="highlight cache directory to delete as well",
+    )
+    clean_parser.set_defaults(run=run_clean)
+
+    list_parser = commands.add_parser("list", help="list pages with their front matter, reading page headers only")
+    list_parser.add_argument(
+        "--tag",
+        help="only list pages with this tag",
+    )
+    list_parser.add_argument(
+        "--only-drafts",
+        action="store_true",
+        help="only list draft pages",
+    )
+    list_parser.set_defaults(run=run_list)
+    return parser
+
+def add_build_arguments(parser):
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=dir_path_public,
+        metavar="DIR",
+        help="directory the site is written to",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose sources changed since the last build",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        metavar="DIR",
+        help="cache rendered markdown in DIR between builds",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=10000,
+        help="maximum number of entries kept in the parse cache",
+    )
+    parser.add_argument(
+        "--no-block-cache",
+        action="store_true",
+        help="do not reuse rendered blocks that repeat across pages",
+    )
+    parser.add_argument(
+        "--highlight",
+        choices=HIGHLIGHT_MODES,
+        default="none",
+        help="syntax highlighter for fenced code blocks naming a language (auto: pygments if installed; "
+        "highlighted markup needs a pygments stylesheet)",
+    )
+    parser.add_argument(
+        "--highlight-cache",
+        metavar="DIR",
+        help="cache highlighted code blocks in DIR between builds",
+    )
+    parser.add_argument(
+        "--highlight-cache-size",
+        type=int,
+        default=10000,
+        help="maximum number of entries kept in the highlight cache",
+    )
+    parser.add_argument(
+        "--link-mode",
+        choices=LINK_MODES,
+        default="copy",
+        help="how static files are placed in the output: byte copy, hard link or reflink",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="detect changed static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="number of threads copying static files",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="overlap reading, rendering and writing pages (helps on slow filesystems)",
+    )
+    parser.add_argument(
+        "--read-threads",
+        type=int,
+        default=4,
+        metavar="N",
+        help="threads prefetching markdown files with --pipeline",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=16,
+        metavar="N",
+        help="pages held per stage with --pipeline",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_spec,
+        metavar="I/N",
+        help="render only shard I of N of the content tree; shard 0 also copies static files",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages marked \"draft: true\" in their front matter",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="origin the site is served from (e.g. https://user.github.io); enables sitemap.xml and atom.xml",
+    )
+    parser.add_argument(
+        "--blog-dir",
+        default="blog",
+        metavar="DIR",
+        help="content folder listed on the paginated blog index",
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        default=10,
+        metavar="N",
+        help="posts per blog index page",
+    )
+    parser.add_argument(
+        "--author",
+        metavar="NAME",
+        help="author of the Atom feed (default: the home page's \"author\" front matter, then the site title)",
+    )
+    parser.add_argument(
+        "--tags-dir",
+        default="tags",
+        metavar="DIR",
+        help="output folder of the per-tag listing pages",
+    )
+    parser.add_argument(
+        "--no-indexes",
+        action="store_true",
+        help="skip the blog index, sitemap and feed",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print wall time per build stage and the slowest pages",
+    )
+    parser.add_argument(
+        "--stats-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed by --stats",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="dump cProfile data of the build to FILE (parent process only with --jobs)",
+    )
+
+def shard_spec(spec):
+    from shard import parse_shard
+    return parse_shard(spec)
+
+def run_build(args):
+    if args.uses:
+        from depgraph import load_graph
+        for page in load_graph(args.output).pages_using(args.uses):
+            print(page)
+        return
+    if args.merge:
+        from shard import merge_shards
+        try:
+            merge_shards(args.merge, args.output)
+        except ValueError as error:
+            sys.exit(f"Error: {error}")
+        # Every shard only knows its own pages, so the indexes are built here
+        options = index_options(args)
+        if options is not None:
+            from depgraph import load_graph
+            from siteindex import write_site_indexes
+            write_site_indexes(load_graph(args.output), args.basepath, dir_path_content, template_path, args.output, options)
+        return
+    build_or_profile(args)
+
+def build_or_profile(args):
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.runcall(build, args)
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    else:
+        build(args)
+
+def run_watch(args):
+    build_or_profile(args)
+    from watch import watch_and_serve
+    watch_and_serve(
+        args.basepath,
+        dir_path_content,
+        dir_path_static,
+        template_path,
+        args.output,
+        make_parse_cache(args),
+        args.port,
+        make_highlighter(args),
+        args.drafts,
+        index_options(args),
+    )
 
-def main():
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+def run_bench(args):
+    from benchmark import main as bench_main
+    return bench_main(args.bench_args)
 
-    print("Copying static files to public directory...")
-    copy_files(dir_path_static, dir_path_public)
+def run_clean(args):
+    import shutil
+    for dir_path in (args.output, args.parse_cache, args.highlight_cache):
+        if dir_path and os.path.exists(dir_path):
+            print(f"Deleting {dir_path}...")
+            shutil.rmtree(dir_path)
+
+# One line per page: source, date, title, tags and a draft marker
+def run_list(args):
+    from gencontent import find_pages, read_page_header
+    for from_path, _ in find_pages(dir_path_content, dir_path_public):
+        front_matter, title = read_page_header(from_path)
+        tags = front_matter.get("tags", [])
+        if not isinstance(tags, list):
+            tags = [tags]
+        draft = front_matter.get("draft") is True
+        if args.tag is not None and args.tag not in tags:
+            continue
+        if args.only_drafts and not draft:
+            continue
+        columns = [from_path, str(front_matter.get("date", "-")), title or "-"]
+        if tags:
+            columns.append("[" + ", ".join(str(tag) for tag in tags) + "]")
+        if draft:
+            columns.append("(draft)")
+        print("  ".join(columns))
+
+def index_options(args):
+    if args.no_indexes:
+        return None
+    from siteindex import IndexOptions
+    return IndexOptions(
+        args.site_url, args.blog_dir.strip("/"), max(1, args.per_page), 20, args.author, args.tags_dir.strip("/"),
+    )
+
+def make_parse_cache(args):
+    if not args.parse_cache:
+        return None
+    from parsecache import ParseCache
+    return ParseCache(args.parse_cache, args.parse_cache_size)
+
+def make_highlighter(args):
+    from highlight import HighlightCache, make_highlighter as new_highlighter
+    try:
+        highlighter = new_highlighter(args.highlight)
+    except ValueError as error:
+        sys.exit(f"Error: {error}")
+    if highlighter is None or not args.highlight_cache:
+        return highlighter
+    return HighlightCache(highlighter, args.highlight_cache, args.highlight_cache_size)
+
+def build(args):
+    from copystatic import copy_files
+    from gencontent import generate_page_all, use_block_cache, PipelineOptions
+    from manifest import new_manifest, load_manifest, save_manifest, remove_unlisted
+    from buildstats import BuildStats
+    from depgraph import DependencyGraph, load_graph
+    from shard import owns_static
+    from highlight import highlighter_name
+
+    basepath = args.basepath
+    dir_path_public = args.output
+    stats = BuildStats() if args.stats else None
+    highlighter = make_highlighter(args)
+    # A full build starts from an empty manifest instead of deleting the
+    # output directory: unchanged files are left alone, and whatever the
+    # build did not produce is deleted at the end
+    if args.incremental:
+        manifest = load_manifest(dir_path_public, basepath, highlighter_name(highlighter))
+        deps = load_graph(dir_path_public)
+    else:
+        manifest = new_manifest(basepath, highlighter_name(highlighter))
+        deps = DependencyGraph()
+
+    parse_cache = make_parse_cache(args)
+    use_block_cache(not args.no_block_cache)
+    pipeline = None
+    if args.pipeline:
+        pipeline = PipelineOptions(max(1, args.read_threads), max(1, args.queue_size))
+
+    if owns_static(args.shard):
+        print("Copying static files to public directory...")
+        with timed(stats, "copy_files"):
+            copy_files(
+                dir_path_static,
+                dir_path_public,
+                manifest,
+                args.link_mode,
+                args.checksum,
+                args.copy_workers,
+            )
 
     print("Generating pages...")
-    generate_page_all(basepath, dir_path_content, template_path, dir_path_public)
+    with timed(stats, "generate_page_all"):
+        generate_page_all(
+            basepath,
+            dir_path_content,
+            template_path,
+            dir_path_public,
+            manifest,
+            args.jobs,
+            parse_cache,
+            stats,
+            deps,
+            args.shard,
+            pipeline,
+            index_options(args) if args.shard is None else None,
+            args.drafts,
+            highlighter,
+        )
+
+    if parse_cache is not None:
+        parse_cache.prune()
+    if args.highlight_cache and highlighter is not None:
+        highlighter.prune()
+
+    deps.save(dir_path_public)
+    save_manifest(dir_path_public, manifest)
+    if not args.incremental:
+        removed = remove_unlisted(dir_path_public, manifest)
+        print(f"Removed {removed} files no longer produced by the build")
+
+    if stats is not None:
+        stats.report(args.stats_top)
+
+def timed(stats, name):
+    if stats is None:
+        from contextlib import nullcontext
+        return nullcontext()
+    return stats.stage(name)
+
+# Lazy re-export for code that imports extract_title from here
+def __getattr__(name):
+    if name == "extract_title":
+        from gencontent import extract_title
+        return extract_title
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
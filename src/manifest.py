@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from markdown_blocks import PARSER_VERSION
+
+MANIFEST_NAME = ".manifest.json"
+
+# mkstemp creates files readable by the owner only; outputs get the
+# permissions open() would have given them
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+
+# Manifest kept in the output directory between incremental builds.
+# "pages" and "static" map a source path to [hash, dest_path], "indexes"
+# maps generated listings and feeds to ["", dest_path]. "highlighter"
+# and "parser_version" record how the pages were rendered.
+def new_manifest(basepath, highlighter=""):
+    return {
+        "basepath": basepath,
+        "highlighter": highlighter,
+        "parser_version": PARSER_VERSION,
+        "template": None,
+        "pages": {},
+        "static": {},
+        "indexes": {},
+    }
+
+
+# highlighter is highlight.highlighter_name() of the build's highlighter
+def load_manifest(dest_dir_path, basepath, highlighter=""):
+    manifest_path = os.path.join(dest_dir_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return new_manifest(basepath, highlighter)
+    with open(manifest_path, "r") as file:
+        manifest = json.load(file)
+    manifest.setdefault("indexes", {})
+    # Every page embeds the basepath and depends on the highlighter and the
+    # parser, so a change of any of them invalidates them all
+    rendering = {"basepath": basepath, "highlighter": highlighter, "parser_version": PARSER_VERSION}
+    if any(manifest.get(key) != value for key, value in rendering.items()):
+        manifest.update(rendering)
+        manifest["template"] = None
+    return manifest
+
+
+def save_manifest(dest_dir_path, manifest):
+    os.makedirs(dest_dir_path, exist_ok=True)
+    save_json(os.path.join(dest_dir_path, MANIFEST_NAME), manifest)
+
+
+# JSON files (build metadata, cache entries) are written through
+# write_if_changed: a crash never leaves half a file behind, and rewriting
+# the same data keeps the file's mtime, so sync tools do not upload it
+# again. Compact JSON is encoded by json's C
+# encoder, about three times faster than indented output.
+def save_json(path, data):
+    write_if_changed(path, lambda file: file.write(json.dumps(data, sort_keys=True, separators=(",", ":"))))
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_unchanged(entries, source_path, file_hash):
+    entry = entries.get(source_path)
+    if entry is None:
+        return False
+    return entry[0] == file_hash and os.path.exists(entry[1])
+
+
+# Deleting outputs whose sources disappeared since the previous build,
+# returning how many files were removed
+def remove_stale(old_entries, new_entries, verbose=True):
+    removed = 0
+    for source_path, (_, dest_path) in old_entries.items():
+        if source_path in new_entries:
+            continue
+        if os.path.exists(dest_path):
+            if verbose:
+                print(f" - {dest_path}")
+            os.remove(dest_path)
+            removed += 1
+        remove_empty_dirs(os.path.dirname(dest_path))
+    return removed
+
+
+def remove_empty_dirs(dir_path):
+    while dir_path and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+
+# Deleting files in the output directory that the build did not produce
+# (leftovers of pages and static files that no longer exist), returning
+# how many were removed. Build metadata is kept.
+def remove_unlisted(dest_dir_path, manifest):
+    listed = {
+        os.path.normpath(dest_path)
+        for entries in (manifest["pages"], manifest["static"], manifest["indexes"])
+        for _, dest_path in entries.values()
+    }
+    removed = 0
+    for root, _, filenames in os.walk(dest_dir_path, topdown=False):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if root == dest_dir_path and filename.startswith(".") and filename.endswith(".json"):
+                continue
+            if os.path.normpath(path) not in listed:
+                os.remove(path)
+                removed += 1
+        if root != dest_dir_path and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+
+# Writing a file through a temporary file in the same directory, which
+# replaces dest_path only if the bytes differ. Returns whether dest_path
+# changed. If write() fails, dest_path is left as it was.
+def write_if_changed(dest_path, write):
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(dest_path) or ".",
+        prefix=f".{os.path.basename(dest_path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "w") as file:
+            write(file)
+        if same_contents(temp_path, dest_path):
+            os.remove(temp_path)
+            return False
+        os.chmod(temp_path, FILE_MODE)
+        os.replace(temp_path, dest_path)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def same_contents(path, other_path):
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+    except FileNotFoundError:
+        return False
+    with open(path, "rb") as file, open(other_path, "rb") as other:
+        while True:
+            chunk = file.read(1 << 16)
+            if chunk != other.read(1 << 16):
+                return False
+            if not chunk:
+                return True
@@ -1,10 +1,14 @@
 import re
 from enum import Enum
 
-from htmlnode import ParentNode
+from htmlnode import LeafNode, ParentNode
 from textnode import TextType, TextNode, text_node_to_html_node
 from inline_markdown import text_to_textnodes
 
+# Bumped whenever the HTML produced for the same markdown changes,
+# which invalidates cached renders
+PARSER_VERSION = 6
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -13,76 +17,134 @@ class BlockType(Enum):
     ULIST = "unordered_list"
     OLIST = "ordered_list"
 
-def markdown_to_html_node(markdown):
-
-    parent = ParentNode("div", [])
-    child_list = []
-    blocks = markdown_to_blocks(markdown)
-
-    for block in blocks:
-        match block_to_block_type(block):
-            case BlockType.PARAGRAPH:
-                paragraph_text = block.replace("\n", " ")
-                child = ParentNode("p", text_to_children(paragraph_text))
-                child_list.append(child)
-            case BlockType.HEADING:
-                level = hashtag_level(block)
-                content = block.lstrip("#").strip()
-                child = ParentNode(f"h{level}", text_to_children(content))
-                child_list.append(child)
-            case BlockType.CODE:
-                lines = block.split("\n")
-                code_content = "\n".join(lines[1:-1]) + "\n"
+# Rules keyed by the first character of a block: the candidate type, the
+# prefix its first line needs, and the prefix every later line needs
+# (None when only the first line matters). Anything else is a paragraph.
+# Ordered list items are numbered from 1 instead of sharing a prefix.
+FIRST_CHAR_RULES = {
+    "`": (BlockType.CODE, "```", None),
+    ">": (BlockType.QUOTE, ">", ">"),
+    "-": (BlockType.ULIST, "- ", "- "),
+    "1": (BlockType.OLIST, "1. ", "1. "),
+    "#": (BlockType.HEADING, "#", None),
+}
+PARAGRAPH_RULE = (BlockType.PARAGRAPH, "", None)
+# "1. ", "2. ", ... so list lines are not formatted one by one
+ORDERED_PREFIXES = tuple(f"{number}. " for number in range(1000))
+OLIST_MARKER_PATTERN = re.compile(r"\d+\.\s*")
+# Info string of an opening fence: its first word names the language
+FENCE_LANGUAGE_PATTERN = re.compile(r"```\s*([\w+#.-]+)")
+
+# Accepts a markdown string or any iterable of lines, such as an open file
+# Blocks are emitted in source order. Earlier versions appended blockquotes
+# ahead of every other block, so pages under docs/ built before this put
+# their quotes first; rebuilding them moves the quotes back in place.
+def markdown_to_html_node(markdown, url_context=None, block_cache=None, highlighter=None):
+    children = []
+    for block_type, lines in iter_blocks(markdown_lines(markdown)):
+        children.append(render_block(block_type, lines, url_context, block_cache, highlighter))
+    return ParentNode("div", children)
+
+# Streaming counterpart of markdown_to_html_node(...).iter_html(): blocks are
+# read, rendered and released one at a time, so memory stays bounded by the
+# largest block rather than the whole document
+def iter_markdown_html(markdown, url_context=None, block_cache=None, highlighter=None):
+    return iter_blocks_html(iter_blocks(markdown_lines(markdown)), url_context, block_cache, highlighter)
+
+def iter_blocks_html(blocks, url_context=None, block_cache=None, highlighter=None):
+    yield "<div>"
+    for block_type, lines in blocks:
+        yield from render_block(block_type, lines, url_context, block_cache, highlighter).iter_html()
+    yield "</div>"
+
+# With a BlockCache, a block seen before (same type, text and basepath) is
+# served as its rendered HTML instead of being parsed again. Blocks the
+# cache does not accept (long ones) are always rendered.
+def render_block(block_type, lines, url_context=None, block_cache=None, highlighter=None):
+    if block_cache is None or not block_cache.accepts(lines):
+        return block_to_html_node(block_type, lines, url_context, highlighter)
+    basepath = url_context.basepath if url_context is not None else None
+    # By name: worker processes get a fresh copy of the highlighter per task
+    highlighter_name = highlighter.name if highlighter is not None else None
+    key = (block_type, basepath, highlighter_name, "\n".join(lines))
+    fragment = block_cache.get(key)
+    if fragment is None:
+        fragment = block_to_html_node(block_type, lines, url_context, highlighter).to_html()
+        block_cache.put(key, fragment)
+    return LeafNode(None, fragment)
 
+def markdown_lines(markdown):
+    if isinstance(markdown, str):
+        return markdown.split("\n")
+    return markdown
+
+def block_to_html_node(block_type, lines, url_context=None, highlighter=None):
+    match block_type:
+        case BlockType.PARAGRAPH:
+            paragraph_text = " ".join(lines)
+            return ParentNode("p", text_to_children(paragraph_text, url_context))
+        case BlockType.HEADING:
+            level = hashtag_level(lines[0])
+            content = "\n".join(lines).lstrip("#").strip()
+            return ParentNode(f"h{level}", text_to_children(content, url_context))
+        case BlockType.CODE:
+            language = fence_language(lines[0])
+            code_content = "\n".join(lines[1:-1]) + "\n"
+
+            highlighted = None
+            if language is not None and highlighter is not None:
+                highlighted = highlighter.highlight(language, code_content)
+            if highlighted is None:
                 text_node = TextNode(code_content, TextType.TEXT)
                 html_node = text_node_to_html_node(text_node)
-                
-                code_node = ParentNode("code", [html_node])
-                pre_node = ParentNode("pre", [code_node])
-                child_list.append(pre_node)
-            case BlockType.QUOTE:
-                clean_lines = []
-                for line in block.split("\n"):
-                    if line.startswith(">"):
-                        clean_lines.append(line.lstrip(">").strip())
-                    else:
-                        clean_lines.append(line.strip())
-                clean_content = "\n".join(clean_lines)
-                
-                child = ParentNode("blockquote", text_to_children(clean_content))
-                parent.children.append(child)
-            case BlockType.ULIST:
-                lines = split_lines(block, BlockType.ULIST)
-                child = ParentNode("ul", lines)
-                child_list.append(child)
-            case BlockType.OLIST:
-                lines = split_lines(block, BlockType.OLIST)
-                child = ParentNode("ol", lines)
-                child_list.append(child) 
-            case _:
-                raise Exception("Invalid block type")
-                
-    parent.children.extend(child_list)
-    return parent
-
-def split_lines(block, block_type):
-    lines = block.split("\n")
+            else:
+                html_node = LeafNode(None, highlighted)
+
+            props = {"class": f"language-{language}"} if language is not None else None
+            code_node = ParentNode("code", [html_node], props)
+            return ParentNode("pre", [code_node])
+        case BlockType.QUOTE:
+            clean_lines = []
+            for line in lines:
+                if line.startswith(">"):
+                    clean_lines.append(line.lstrip(">").strip())
+                else:
+                    clean_lines.append(line.strip())
+            clean_content = "\n".join(clean_lines)
+            return ParentNode("blockquote", text_to_children(clean_content, url_context))
+        case BlockType.ULIST:
+            return ParentNode("ul", list_items(lines, BlockType.ULIST, url_context))
+        case BlockType.OLIST:
+            return ParentNode("ol", list_items(lines, BlockType.OLIST, url_context))
+        case _:
+            raise Exception("Invalid block type")
+
+# "```python" -> "python"; None for a bare fence
+def fence_language(line):
+    match = FENCE_LANGUAGE_PATTERN.match(line)
+    return match.group(1).lower() if match else None
+
+def split_lines(block, block_type, url_context=None):
+    return list_items(block.split("\n"), block_type, url_context)
+
+def list_items(lines, block_type, url_context=None):
     children = []
     for line in lines:
         if not line.strip():
             continue
-            
+
         if block_type == BlockType.ULIST:
             content = line.lstrip("- ").strip()
         elif block_type == BlockType.OLIST:
-            content = re.sub(r"^\d+\.\s*", "", line).strip()
+            match = OLIST_MARKER_PATTERN.match(line)
+            content = (line[match.end():] if match else line).strip()
         else:
             content = line.strip()
-            
+
         # Create li element with processed content
-        li_node = ParentNode("li", text_to_children(content))
+        li_node = ParentNode("li", text_to_children(content, url_context))
         children.append(li_node)
-        
+
     return children
 
 def hashtag_level(hashtag):
@@ -95,47 +157,89 @@ def hashtag_level(hashtag):
 
     return min(max(count, 1), 6)
 
-def text_to_children(text):
+def text_to_children(text, url_context=None):
     text_nodes = text_to_textnodes(text)
     html_nodes = []
     for node in text_nodes:
-        html_nodes.append(text_node_to_html_node(node))
+        html_nodes.append(text_node_to_html_node(node, url_context))
     return html_nodes
 
 def block_to_block_type(block):
-    lines = block.split("\n")
+    return lines_to_block_type(block.split("\n"))
 
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return BlockType.CODE
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
+def lines_to_block_type(lines):
+    block_type, line_prefix = first_line_rule(lines[0])
+    if block_type is BlockType.OLIST:
+        for number, line in enumerate(lines[1:], 2):
+            if not line.startswith(ordered_prefix(number)):
                 return BlockType.PARAGRAPH
-        return BlockType.QUOTE
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
+    elif line_prefix is not None:
+        for line in lines[1:]:
+            if not line.startswith(line_prefix):
                 return BlockType.PARAGRAPH
-        return BlockType.ULIST
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return BlockType.PARAGRAPH
-            i += 1
-        return BlockType.OLIST
-    if block.startswith(("#", "##", "###", "####", "#####", "######")):
-        return BlockType.HEADING
-    return BlockType.PARAGRAPH
+    return final_block_type(block_type, lines)
+
+# Candidate type of a block and the prefix its later lines need
+def first_line_rule(line):
+    block_type, first_prefix, line_prefix = FIRST_CHAR_RULES.get(line[:1], PARAGRAPH_RULE)
+    if not line.startswith(first_prefix):
+        return BlockType.PARAGRAPH, None
+    return block_type, line_prefix
+
+def ordered_prefix(number):
+    if number < len(ORDERED_PREFIXES):
+        return ORDERED_PREFIXES[number]
+    return f"{number}. "
+
+# A code fence only counts once the block is known to end with one
+def final_block_type(block_type, lines):
+    if block_type is BlockType.CODE and (len(lines) < 2 or not lines[-1].startswith("```")):
+        return BlockType.PARAGRAPH
+    return block_type
 
 def markdown_to_blocks(markdown):
-    list_of_blocks = []
-    markdown = markdown.strip()
-    blocks = re.split(r"\n{2,}", markdown)
-    for block in blocks:
-        stripped_block = block.strip()
-        if stripped_block:
-            lines = [line.strip() for line in stripped_block.splitlines()]
-            cleaned_block = "\n".join(lines)
-            list_of_blocks.append(cleaned_block)
-    return list_of_blocks
\ No newline at end of file
+    return ["\n".join(lines) for _, lines in iter_blocks(markdown_lines(markdown))]
+
+# Line-oriented block reader: yields (block_type, lines) per block.
+# Blocks are separated by empty lines. Lines are stripped, and
+# whitespace-only lines at the edges of a block are dropped. The type is
+# narrowed as lines arrive, so no block is scanned a second time.
+def iter_blocks(lines):
+    block = []
+    block_type = None
+    line_prefix = None
+    numbered = False
+    blank_lines = 0
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line:
+            if block:
+                yield final_block_type(block_type, block), block
+                block = []
+                blank_lines = 0
+            continue
+        line = line.strip()
+        if not line:
+            # Whitespace-only: kept only if more of the block follows
+            if block:
+                blank_lines += 1
+            continue
+        if not block:
+            block_type, line_prefix = first_line_rule(line)
+            numbered = block_type is BlockType.OLIST
+        elif blank_lines:
+            block.extend([""] * blank_lines)
+            blank_lines = 0
+            if line_prefix is not None:
+                # An empty line inside a list or quote fails its prefix
+                block_type = BlockType.PARAGRAPH
+                line_prefix = None
+        elif line_prefix is not None:
+            if numbered:
+                line_prefix = ordered_prefix(len(block) + 1)
+            if not line.startswith(line_prefix):
+                block_type = BlockType.PARAGRAPH
+                line_prefix = None
+        block.append(line)
+    if block:
+        yield final_block_type(block_type, block), block
@@ -0,0 +1,40 @@
+import re
+
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+
+
+# Template compiled once per build: static segments at even indices and
+# slot names ("Title" / "Content") at odd indices, with the template's own
+# root-relative links already pointing below the basepath.
+class PageTemplate():
+    def __init__(self, template_content, basepath="/"):
+        template_content = template_content.replace('href="/', f'href="{basepath}')
+        template_content = template_content.replace('src="/', f'src="{basepath}')
+        self.segments = SLOT_PATTERN.split(template_content)
+        self.content_slots = self.segments[1::2].count("Content")
+
+    def render(self, title, content):
+        return "".join(self.iter_parts(title, [content]))
+
+    def write(self, fp, title, fragments):
+        # The fragments can only be consumed once
+        if self.content_slots > 1:
+            fragments = ["".join(fragments)]
+        fp.writelines(self.iter_parts(title, fragments))
+
+    def iter_parts(self, title, fragments):
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                yield segment
+            elif segment == "Title":
+                yield title
+            else:
+                yield from fragments
+
+    def __repr__(self):
+        return f"PageTemplate({self.segments})"
+
+
+def load_template(template_path, basepath="/"):
+    with open(template_path, "r") as file:
+        return PageTemplate(file.read(), basepath)
@@ -0,0 +1,27 @@
+import hashlib
+
+from entrycache import EntryCache
+from markdown_blocks import PARSER_VERSION
+
+
+# On-disk cache of rendered markdown, keyed by the source text, the basepath,
+# the parser version and a variant naming other render options (the syntax
+# highlighter). Each entry holds the title and the HTML fragment.
+class ParseCache(EntryCache):
+    def key(self, markdown, basepath, variant=""):
+        digest = hashlib.sha256()
+        digest.update(f"{PARSER_VERSION}\0{basepath}\0{variant}\0".encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        entry = self.read_entry(key)
+        if entry is None:
+            return None
+        return entry["title"], entry["html"]
+
+    def put(self, key, title, html):
+        self.write_entry(key, {"title": title, "html": html})
+
+    def __repr__(self):
+        return f"ParseCache({self.cache_dir}, {self.max_entries})"
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from copystatic import copy_file
+from depgraph import DEPS_NAME, DependencyGraph
+from manifest import MANIFEST_NAME
+
+
+# Parsing "i/N" (0 <= i < N) into (index, count)
+def parse_shard(spec):
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid shard: {spec} (expected i/N)")
+    index, count = int(index), int(count)
+    if count < 1 or index >= count:
+        raise ValueError(f"Invalid shard: {spec} (expected 0 <= i < N)")
+    return index, count
+
+
+# Pages are assigned by a hash of their path relative to the content
+# directory, so every machine agrees on the partition regardless of where
+# the checkout lives or in which order the filesystem lists it.
+def shard_of(from_path, dir_path_content, count):
+    rel_path = os.path.relpath(from_path, dir_path_content).replace(os.sep, "/")
+    digest = hashlib.sha256(rel_path.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+def in_shard(from_path, dir_path_content, shard):
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(from_path, dir_path_content, count) == index
+
+# The static tree is copied by one shard only
+def owns_static(shard):
+    return shard is None or shard[0] == 0
+
+
+# Combining the output directories of all shards into dest_dir_path, which
+# is emptied first. Every output path has to come from exactly one shard,
+# and no shard may live inside the destination or the other way round;
+# all of this is checked before anything is deleted or copied. Dependency
+# graphs are merged with their outputs moved under dest_dir_path,
+# per-shard manifests are not.
+def merge_shards(shard_dirs, dest_dir_path):
+    dest = os.path.abspath(dest_dir_path)
+    for shard_dir in shard_dirs:
+        if not os.path.isdir(shard_dir):
+            raise ValueError(f"Shard directory not found: {shard_dir}")
+        shard = os.path.abspath(shard_dir)
+        if os.path.commonpath([shard, dest]) in (shard, dest):
+            raise ValueError(f"Shard directory {shard_dir} overlaps the output directory {dest_dir_path}")
+
+    sources = {}
+    conflicts = []
+    for shard_dir in shard_dirs:
+        for rel_path in list_outputs(shard_dir):
+            if rel_path in sources:
+                conflicts.append(f"{rel_path} ({sources[rel_path]}, {shard_dir})")
+            else:
+                sources[rel_path] = shard_dir
+    if conflicts:
+        raise ValueError("Output produced by more than one shard: " + "; ".join(conflicts))
+
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+
+    for rel_path, shard_dir in sorted(sources.items()):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(os.path.join(shard_dir, rel_path), dest_path)
+
+    deps = DependencyGraph()
+    for shard_dir in shard_dirs:
+        deps_path = os.path.join(shard_dir, DEPS_NAME)
+        if not os.path.exists(deps_path):
+            continue
+        with open(deps_path, "r") as file:
+            pages = json.load(file)
+        for from_path, page in pages.items():
+            rel_path = os.path.relpath(page["output"], shard_dir)
+            page["output"] = str(Path(dest_dir_path, rel_path))
+            deps.pages[from_path] = page
+    deps.save(dest_dir_path)
+    print(f"Merged {len(sources)} files from {len(shard_dirs)} shards into {dest_dir_path}")
+    return len(sources)
+
+# Relative paths of the files a shard produced, without build metadata
+def list_outputs(dir_path):
+    if not os.path.isdir(dir_path):
+        raise FileNotFoundError(f"Not a directory: {dir_path}")
+    outputs = []
+    for root, _, filenames in os.walk(dir_path):
+        for filename in filenames:
+            rel_path = os.path.relpath(os.path.join(root, filename), dir_path)
+            if rel_path in (MANIFEST_NAME, DEPS_NAME):
+                continue
+            outputs.append(rel_path)
+    return outputs
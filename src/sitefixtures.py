@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+# Smallest template that shows both the title and the content of a page
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+# Base class for tests building a site in a temporary directory laid out
+# like the project: content/, static/, template.html and docs/ as output.
+# Only the paths are set up; tests write the files they need.
+class TempSiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        write_file(path, text)
+
+    def write_template(self, path=None):
+        self.write(path or self.template, TEMPLATE)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts)) as file:
+            return file.read()
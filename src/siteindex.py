@@ -0,0 +1,215 @@
+import html
+import os
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape as xml_escape
+
+from manifest import remove_stale, write_if_changed
+from pagetemplate import load_template
+
+SITEMAP_NAME = "sitemap.xml"
+ATTRIBUTE_ENTITIES = {'"': "&quot;"}
+FEED_NAME = "atom.xml"
+
+# site_url is the origin the site is served from ("https://example.org");
+# the sitemap and the feed need absolute URLs and are skipped without it.
+# blog_dir is the content folder whose pages are listed, per_page the
+# number of posts per listing page and feed_entries the feed length.
+# author names the feed's author (the home page's "author" front matter,
+# then the site title, when unset); tags_dir is the output folder of the
+# tag listing pages.
+IndexOptions = namedtuple(
+    "IndexOptions",
+    ["site_url", "blog_dir", "per_page", "feed_entries", "author", "tags_dir"],
+    defaults=(None, "tags"),
+)
+
+# A page as recorded by the build: no file in content/ is read again.
+# Titles are HTML (escaped when they were extracted), authors plain text.
+IndexedPage = namedtuple("IndexedPage", ["source", "title", "url", "updated", "tags", "author"])
+# Characters kept in the folder name of a tag page
+TAG_SLUG_PATTERN = re.compile(r"[^\w-]+")
+
+
+# Writing the blog listing pages, one listing page per tag, sitemap.xml and
+# atom.xml from the page metadata kept in the dependency graph. Outputs are only rewritten when
+# their bytes change. With a manifest, listing pages that no longer exist
+# (fewer posts than before) are deleted. When the blog has a landing page
+# of its own (blog/index.md), the listing starts at blog/page/1/ instead.
+# Returns {name: ["", dest_path]}.
+def write_site_indexes(deps, basepath, dir_path_content, template_path, dest_dir_path, options, manifest=None):
+    pages = collect_pages(deps, dest_dir_path, basepath)
+    posts = blog_posts(pages, dir_path_content, options.blog_dir)
+    produced = {os.path.normpath(page["output"]) for page in deps.pages.values()}
+    landing_path = os.path.normpath(os.path.join(dest_dir_path, listing_path(options.blog_dir, 1)))
+    has_landing = landing_path in produced
+    outputs = {}
+    for rel_path, text in blog_listing(posts, basepath, template_path, options, has_landing):
+        outputs[rel_path] = text
+    for rel_path, text in tag_listing(pages, basepath, template_path, options):
+        outputs[rel_path] = text
+    if options.site_url:
+        listing_urls = [rel_path_url(basepath, rel_path) for rel_path in outputs]
+        outputs[SITEMAP_NAME] = sitemap(pages, listing_urls, posts, options.site_url)
+        outputs[FEED_NAME] = atom_feed(pages, posts, basepath, options)
+
+    entries = {}
+    written = 0
+    for rel_path, text in outputs.items():
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if os.path.normpath(dest_path) in produced:
+            raise ValueError(f"Index output {dest_path} is also produced by a page")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        written += write_if_changed(dest_path, lambda file: file.write(text))
+        entries[rel_path] = ["", dest_path]
+
+    removed = 0
+    if manifest is not None:
+        removed = remove_stale(manifest["indexes"], entries, verbose=False)
+        manifest["indexes"] = entries
+    print(f"Site indexes: {written} written, {len(entries) - written} unchanged, {removed} removed")
+    return entries
+
+def collect_pages(deps, dest_dir_path, basepath):
+    pages = []
+    for from_path, page in sorted(deps.pages.items()):
+        meta = page.get("meta")
+        if meta is None:
+            continue
+        rel_path = os.path.relpath(page["output"], dest_dir_path).replace(os.sep, "/")
+        pages.append(IndexedPage(
+            from_path, meta["title"], rel_path_url(basepath, rel_path), meta["updated"], meta.get("tags", []), meta.get("author"),
+        ))
+    return pages
+
+# Pages below blog_dir (other than its own index), newest first
+def blog_posts(pages, dir_path_content, blog_dir):
+    blog_path = os.path.normpath(os.path.join(dir_path_content, blog_dir))
+    blog_index = os.path.join(blog_path, "index.md")
+    posts = [
+        page for page in pages
+        if os.path.normpath(page.source).startswith(blog_path + os.sep)
+        and os.path.normpath(page.source) != blog_index
+    ]
+    return sorted(posts, key=lambda page: (-page.updated, page.title))
+
+# "blog/index.html" for the first page, then "blog/page/2/index.html", ...
+# With a landing page, the first page is "blog/page/1/index.html"
+def listing_path(blog_dir, number, has_landing=False):
+    if number == 1 and not has_landing:
+        return f"{blog_dir}/index.html"
+    return f"{blog_dir}/page/{number}/index.html"
+
+def blog_listing(posts, basepath, template_path, options, has_landing=False):
+    if not posts:
+        return
+    template = load_template(template_path, basepath)
+    page_count = (len(posts) + options.per_page - 1) // options.per_page
+    for number in range(1, page_count + 1):
+        chunk = posts[(number - 1) * options.per_page:number * options.per_page]
+        links = []
+        if number > 1:
+            newer = listing_path(options.blog_dir, number - 1, has_landing)
+            links.append(f'<a href="{rel_path_url(basepath, newer)}">Newer posts</a>')
+        if number < page_count:
+            older = listing_path(options.blog_dir, number + 1, has_landing)
+            links.append(f'<a href="{rel_path_url(basepath, older)}">Older posts</a>')
+        title = "Blog" if number == 1 else f"Blog, page {number} of {page_count}"
+        nav = f"<nav>{' '.join(links)}</nav>" if links else ""
+        content = f"<div><h1>{title}</h1><ul>{list_items(chunk)}</ul>{nav}</div>"
+        yield listing_path(options.blog_dir, number, has_landing), template.render(title, content)
+
+# "tags/index.html" linking to "tags/<slug>/index.html" for every tag, each
+# listing the pages with that tag, newest first. Tags whose slugs are equal
+# ("C++" and "c") share a page.
+def tag_listing(pages, basepath, template_path, options):
+    tagged = {}
+    names = {}
+    for page in sorted(pages, key=lambda page: (-page.updated, page.title)):
+        for tag in page.tags:
+            slug = tag_slug(tag)
+            names.setdefault(slug, tag)
+            tag_pages = tagged.setdefault(slug, [])
+            # A page listing the same tag twice
+            if not tag_pages or tag_pages[-1] is not page:
+                tag_pages.append(page)
+    if not tagged:
+        return
+    template = load_template(template_path, basepath)
+    tag_items = []
+    for slug in sorted(tagged):
+        name = html.escape(names[slug])
+        rel_path = f"{options.tags_dir}/{slug}/index.html"
+        content = f"<div><h1>Tagged {name}</h1><ul>{list_items(tagged[slug])}</ul></div>"
+        yield rel_path, template.render(f"Tagged {name}", content)
+        tag_items.append(f'<li><a href="{html.escape(rel_path_url(basepath, rel_path))}">{name}</a> ({len(tagged[slug])})</li>')
+    yield f"{options.tags_dir}/index.html", template.render("Tags", f"<div><h1>Tags</h1><ul>{''.join(tag_items)}</ul></div>")
+
+# Lowercase, with runs of other characters than letters, digits, "_" and
+# "-" replaced by "-"
+def tag_slug(tag):
+    return TAG_SLUG_PATTERN.sub("-", tag.lower()).strip("-") or "-"
+
+def list_items(pages):
+    return "".join(
+        f'<li><a href="{html.escape(page.url)}">{page.title}</a> '
+        f'<time datetime="{iso_date(page.updated)}">{iso_date(page.updated)[:10]}</time></li>'
+        for page in pages
+    )
+
+def sitemap(pages, listing_urls, posts, site_url):
+    newest = iso_date(posts[0].updated) if posts else None
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for page in pages:
+        lines.append(f"<url><loc>{xml_escape(absolute_url(site_url, page.url))}</loc><lastmod>{iso_date(page.updated)}</lastmod></url>")
+    for url in listing_urls:
+        lastmod = f"<lastmod>{newest}</lastmod>" if newest else ""
+        lines.append(f"<url><loc>{xml_escape(absolute_url(site_url, url))}</loc>{lastmod}</url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+def atom_feed(pages, posts, basepath, options):
+    home = absolute_url(options.site_url, basepath)
+    home_page = next((page for page in pages if page.url == basepath), None)
+    feed_title = home_page.title if home_page is not None else "Blog"
+    # Atom requires an author for the feed or for every entry
+    author = options.author or (home_page and home_page.author) or html.unescape(feed_title)
+    updated = iso_date(max((post.updated for post in posts), default=0))
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f'<title type="html">{xml_escape(feed_title)}</title>',
+        f'<link href="{xml_escape(absolute_url(options.site_url, basepath + FEED_NAME), ATTRIBUTE_ENTITIES)}" rel="self"/>',
+        f'<link href="{xml_escape(home, ATTRIBUTE_ENTITIES)}"/>',
+        f"<id>{xml_escape(home)}</id>",
+        f"<updated>{updated}</updated>",
+        author_element(author),
+    ]
+    for post in posts[:options.feed_entries]:
+        url = xml_escape(absolute_url(options.site_url, post.url), ATTRIBUTE_ENTITIES)
+        categories = "".join(f'<category term="{xml_escape(tag, ATTRIBUTE_ENTITIES)}"/>' for tag in post.tags)
+        entry_author = author_element(post.author) if post.author else ""
+        lines.append(
+            f'<entry><title type="html">{xml_escape(post.title)}</title><link href="{url}"/>'
+            f"<id>{url}</id><updated>{iso_date(post.updated)}</updated>{entry_author}{categories}</entry>"
+        )
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+def author_element(name):
+    return f"<author><name>{xml_escape(name)}</name></author>"
+
+# Site URL of an output file: directory URLs for index.html pages
+def rel_path_url(basepath, rel_path):
+    if rel_path == "index.html":
+        return basepath
+    if rel_path.endswith("/index.html"):
+        return basepath + rel_path[:-len("index.html")]
+    return basepath + rel_path
+
+def absolute_url(site_url, url):
+    return site_url.rstrip("/") + url
+
+def iso_date(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
@@ -0,0 +1,31 @@
+import unittest
+from benchmark import CORPORA, STAGES, make_corpus, bench_corpus, compare_results
+from markdown_blocks import markdown_to_html_node
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        self.assertEqual(make_corpus("links", 3, seed=1), make_corpus("links", 3, seed=1))
+        self.assertNotEqual(make_corpus("links", 3, seed=1), make_corpus("links", 3, seed=2))
+
+    def test_corpora_render(self):
+        for kind in CORPORA:
+            with self.subTest(kind=kind):
+                for markdown in make_corpus(kind, 2, size=1):
+                    self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div>"))
+
+    def test_bench_corpus_reports_every_stage(self):
+        results = bench_corpus(make_corpus("small", 1, size=1), repeat=1)
+        for stage in STAGES:
+            self.assertGreaterEqual(results[stage], 0)
+        self.assertEqual(results["pages"], 10)
+
+    def test_compare_results(self):
+        baseline = {"results": {"links": {"to_html": 1.0, "file_write": 1.0}}}
+        current = {"results": {"links": {"to_html": 1.05, "file_write": 1.5}, "code": {"to_html": 9.0}}}
+        self.assertEqual(
+            compare_results(baseline, current, threshold=0.10),
+            [("links", "file_write", 1.0, 1.5, 1.5)],
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from blockcache import BlockCache
+from markdown_blocks import markdown_to_html_node
+from textnode import URLContext
+
+class TestBlockCache(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_size_limits(self):
+        cache = BlockCache(max_block_size=10, max_chars=20)
+        self.assertTrue(cache.accepts(["12345", "123"]))
+        self.assertFalse(cache.accepts(["12345", "12345"]))
+        cache.put(("p", "aaaa"), "<p>aaaa</p>")
+        cache.put(("p", "bbbb"), "<p>bbbb</p>")
+        self.assertEqual(list(cache.entries), [("p", "bbbb")])
+        self.assertEqual(cache.chars, 15)
+
+    def test_long_blocks_are_not_cached(self):
+        cache = BlockCache(max_block_size=20)
+        markdown = "short\n\n" + "long " * 10
+        html = markdown_to_html_node(markdown, None, cache).to_html()
+        self.assertEqual(html, markdown_to_html_node(markdown).to_html())
+        self.assertEqual(len(cache), 1)
+
+    def test_cached_render_matches(self):
+        cache = BlockCache()
+        markdown = "# Title\n\nShared [link](/terms) and **bold**\n\n- one\n- two\n\nShared [link](/terms) and **bold**"
+        expected = markdown_to_html_node(markdown, URLContext("/site/")).to_html()
+        for _ in range(2):
+            html = markdown_to_html_node(markdown, URLContext("/site/"), cache).to_html()
+            self.assertEqual(html, expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_basepath_is_part_of_the_key(self):
+        cache = BlockCache()
+        markdown_to_html_node("[home](/)", URLContext("/a/"), cache)
+        html = markdown_to_html_node("[home](/)", URLContext("/b/"), cache).to_html()
+        self.assertEqual(html, '<div><p><a href="/b/">home</a></p></div>')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from buildstats import BuildStats
+
+class TestBuildStats(unittest.TestCase):
+    def test_stage_accumulates(self):
+        stats = BuildStats()
+        with stats.stage("parse"):
+            pass
+        stats.add_stage("parse", 1.0)
+        seconds, count = stats.stages["parse"]
+        self.assertGreaterEqual(seconds, 1.0)
+        self.assertEqual(count, 2)
+
+    def test_merge_stages(self):
+        stats = BuildStats()
+        stats.add_stage("write", 0.5)
+        stats.merge_stages({"write": [0.25, 2], "parse": [1.0, 1]})
+        self.assertEqual(stats.stages, {"write": [0.75, 3], "parse": [1.0, 1]})
+
+    def test_counters(self):
+        stats = BuildStats()
+        stats.count("block_cache_hits")
+        stats.merge_counters({"block_cache_hits": 2, "block_cache_misses": 1})
+        self.assertEqual(stats.counters, {"block_cache_hits": 3, "block_cache_misses": 1})
+
+    def test_slowest_pages(self):
+        stats = BuildStats()
+        stats.add_page("a.md", 0.1, 100, 3)
+        stats.add_page("b.md", 0.3, 200, None)
+        stats.add_page("c.md", 0.2, 300, 5)
+        self.assertEqual(
+            [path for _, path, _, _ in stats.slowest_pages(2)],
+            ["b.md", "c.md"],
+        )
+        self.assertEqual(stats.stages["generate_page"][1], 3)
+
+if __name__ == "__main__":
+    unittest.main()
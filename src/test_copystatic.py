@@ -0,0 +1,83 @@
+import os
+import unittest
+from copystatic import copy_files, scan_static
+from manifest import new_manifest
+from sitefixtures import TempSiteTestCase
+
+class TestCopyFiles(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def test_scan_static_orders_directories(self):
+        self.write(os.path.join(self.static, "images", "icons", "b.png"), "png")
+        dir_paths, files = scan_static(self.static, self.public)
+        self.assertEqual(
+            dir_paths,
+            [self.public, os.path.join(self.public, "images"), os.path.join(self.public, "images", "icons")],
+        )
+        self.assertEqual(len(files), 3)
+
+    def test_copy_and_skip_unchanged(self):
+        copy_files(self.static, self.public)
+        self.assertEqual(self.read("images", "a.png"), "png")
+        # Same size and mtime on both sides: the file is left alone
+        dest_path = os.path.join(self.public, "index.css")
+        with open(dest_path, "w") as file:
+            file.write("EDITED!")
+        source_stat = os.stat(os.path.join(self.static, "index.css"))
+        os.utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        copy_files(self.static, self.public)
+        self.assertEqual(self.read("index.css"), "EDITED!")
+
+    def test_manifest_removes_deleted_sources(self):
+        manifest = new_manifest("/")
+        copy_files(self.static, self.public, manifest)
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        copy_files(self.static, self.public, manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertEqual(list(manifest["static"]), [os.path.join(self.static, "index.css")])
+
+    def test_link_modes(self):
+        for mode in ["hardlink", "reflink"]:
+            with self.subTest(mode=mode):
+                public = os.path.join(self.root, mode)
+                copy_files(self.static, public, mode=mode)
+                with open(os.path.join(public, "images", "a.png")) as file:
+                    self.assertEqual(file.read(), "png")
+
+    def test_checksum_ignores_touched_files(self):
+        manifest = new_manifest("/")
+        copy_files(self.static, self.public, manifest, checksum=True)
+        os.remove(os.path.join(self.public, "index.css"))
+        self.write(os.path.join(self.public, "index.css"), "kept")
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+        copy_files(self.static, self.public, manifest, checksum=True)
+        self.assertEqual(self.read("index.css"), "kept")
+
+    def test_checksum_copies_edits_that_keep_size_and_mtime(self):
+        source_path = os.path.join(self.static, "index.css")
+        for manifest in (new_manifest("/"), None):
+            with self.subTest(manifest=manifest is not None):
+                self.write(source_path, "body {}")
+                copy_files(self.static, self.public, manifest, checksum=True)
+                stat = os.stat(source_path)
+                self.write(source_path, "BODY {}")
+                os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                copy_files(self.static, self.public, manifest, checksum=True)
+                self.assertEqual(self.read("index.css"), "BODY {}")
+
+    def test_threaded_copy(self):
+        for i in range(20):
+            self.write(os.path.join(self.static, "many", f"{i}.txt"), str(i))
+        copy_files(self.static, self.public, workers=4)
+        for i in range(20):
+            self.assertEqual(self.read("many", f"{i}.txt"), str(i))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            copy_files(self.static, self.public, mode="symlink")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+from depgraph import DependencyGraph, load_graph, page_references, site_path
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.record_page(
+            "content/index.md", "docs/index.html", "template.html",
+            ["images/rivendell.png"], ["blog/tom", "https://boot.dev"],
+        )
+        self.graph.record_page(
+            "content/blog/tom/index.md", "docs/blog/tom/index.html", "template.html",
+            ["images/tom.png", "images/rivendell.png"], [],
+        )
+
+    def test_page_references(self):
+        markdown = "![a](/images/a.png?v=2) [b](/blog/b#top) [c](https://x.dev/y)"
+        self.assertEqual(page_references(markdown), (["images/a.png"], ["blog/b", "https://x.dev/y"]))
+        self.assertEqual(site_path("/images/a.png"), "images/a.png")
+
+    def test_pages_using(self):
+        self.assertEqual(
+            self.graph.pages_using("rivendell.png"),
+            ["content/blog/tom/index.md", "content/index.md"],
+        )
+        self.assertEqual(self.graph.pages_using("/images/tom.png"), ["content/blog/tom/index.md"])
+        self.assertEqual(self.graph.pages_using("ivendell.png"), [])
+
+    def test_prune_and_persist(self):
+        self.graph.prune({"content/index.md"})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.graph.save(tmp_dir)
+            loaded = load_graph(tmp_dir)
+        self.assertEqual(list(loaded.pages), ["content/index.md"])
+        self.assertEqual(loaded.pages, self.graph.pages)
+
+if __name__ == "__main__":
+    unittest.main()
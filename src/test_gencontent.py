@@ -0,0 +1,144 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from buildstats import BuildStats
+from manifest import new_manifest
+from gencontent import generate_page_all, PipelineOptions, page_meta, parse_front_matter, read_page_header, split_front_matter
+from sitefixtures import TempSiteTestCase
+
+class TestPipelinedBuild(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_template()
+        for i in range(20):
+            self.write(os.path.join(self.content, f"dir{i % 4}", f"page{i}.md"), f"# Page {i}\n\n- [home](/)\n- _{i}_")
+
+    def build(self, dest, pipeline=None):
+        log = io.StringIO()
+        with redirect_stdout(log):
+            generate_page_all("/blog/", self.content, self.template, dest, pipeline=pipeline)
+        tree = {}
+        for root, _, filenames in os.walk(dest):
+            for filename in filenames:
+                with open(os.path.join(root, filename)) as file:
+                    tree[os.path.relpath(os.path.join(root, filename), dest)] = file.read()
+        return log.getvalue().replace(dest, "DEST"), tree
+
+    def test_pipeline_matches_serial_build(self):
+        serial = self.build(os.path.join(self.root, "serial"))
+        pipelined = self.build(os.path.join(self.root, "pipelined"), PipelineOptions(3, 2))
+        self.assertEqual(pipelined, serial)
+        self.assertEqual(len(serial[1]), 20)
+
+    def test_streamed_pages_time_rendering_apart_from_writing(self):
+        stats = BuildStats()
+        with redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, self.public, stats=stats)
+        self.assertEqual(stats.stages["markdown_to_html_node"][1], 20)
+        self.assertEqual(stats.stages["write_page"][1], 20)
+
+    def test_write_error_is_raised(self):
+        dest = os.path.join(self.root, "out")
+        # A file where a page directory should go makes writing fail
+        self.write(os.path.join(dest, "dir1"), "")
+        with self.assertRaises(OSError), redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, dest, pipeline=PipelineOptions(2, 1))
+
+class TestFrontMatter(TempSiteTestCase):
+    def test_parse_values(self):
+        fields = parse_front_matter([
+            "title: 'Hello: world'",
+            "draft: true",
+            "tags: [a, b]",
+            "authors:",
+            "- tom",
+            "- bombadil",
+        ])
+        self.assertEqual(fields, {
+            "title": "Hello: world",
+            "draft": True,
+            "tags": ["a", "b"],
+            "authors": ["tom", "bombadil"],
+        })
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["no separator"])
+
+    def test_split_body(self):
+        fields, body = split_front_matter("---\ndate: 2024-01-02\n---\n# Title\n\ntext")
+        self.assertEqual((fields, body), ({"date": "2024-01-02"}, "# Title\n\ntext"))
+
+    def test_unclosed_fence_is_body(self):
+        markdown = "---\n# Title"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_page_header(self):
+        path = os.path.join(self.root, "page.md")
+        self.write(path, "---\ntags: [x]\n---\nintro\n# Heading\n\nbody")
+        self.assertEqual(read_page_header(path), ({"tags": ["x"]}, "Heading"))
+
+    def test_page_meta(self):
+        path = os.path.join(self.root, "page.md")
+        self.write(path, "# Page")
+        meta = page_meta(path, "Page", {"date": "2024-01-02", "tags": "x", "author": "Tom"})
+        self.assertEqual(meta, {"title": "Page", "updated": 1704153600.0, "tags": ["x"], "author": "Tom"})
+
+    def test_serial_and_parallel_builds_agree(self):
+        self.write_template()
+        pages = {
+            "front.md": "---\ntitle: Front\n---\n# H\n\ntext",
+            "indented.md": " ---\ntitle: X\n---\n# H",
+            "unclosed.md": "---\n# H",
+        }
+        for name, markdown in pages.items():
+            self.write(os.path.join(self.content, name), markdown)
+        outputs = []
+        for jobs in (1, 2):
+            dest = os.path.join(self.root, f"jobs{jobs}")
+            with redirect_stdout(io.StringIO()):
+                generate_page_all("/", self.content, self.template, dest, jobs=jobs)
+            outputs.append({name: self.read_output(dest, name) for name in pages})
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[0]["indented.md"], "<title>X</title><div><h1>H</h1></div>")
+
+    def read_output(self, dest, name):
+        with open(os.path.join(dest, name.replace(".md", ".html"))) as file:
+            return file.read()
+
+    def test_title_is_escaped(self):
+        self.write_template()
+        self.write(os.path.join(self.content, "index.md"), "# A < B & C")
+        with redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, self.public)
+        self.assertEqual(self.read("index.html"), "<title>A &lt; B &amp; C</title><div><h1>A &lt; B &amp; C</h1></div>")
+
+    def test_drafts_are_skipped(self):
+        self.write_template()
+        self.write(os.path.join(self.content, "index.md"), "---\ntitle: Home\n---\n\ntext")
+        self.write(os.path.join(self.content, "draft.md"), "---\ndraft: yes\n---\n# Draft")
+        with redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, self.public, drafts=False)
+        self.assertEqual(sorted(os.listdir(self.public)), ["index.html"])
+        self.assertEqual(self.read("index.html"), "<title>Home</title><div><p>text</p></div>")
+
+    def test_drafts_are_skipped_with_manifest(self):
+        self.write_template()
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "draft.md"), "---\ndraft: yes\n---\n# Draft")
+        manifest = new_manifest("/")
+        with redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, self.public, manifest, drafts=False)
+        self.assertEqual(sorted(os.listdir(self.public)), ["index.html"])
+        self.assertEqual(list(manifest["pages"]), [os.path.join(self.content, "index.md")])
+
+    def test_streamed_page_keeps_text_before_title(self):
+        self.write_template()
+        self.write(os.path.join(self.content, "index.md"), "intro\n\n# Home\n\ntext")
+        with redirect_stdout(io.StringIO()):
+            generate_page_all("/", self.content, self.template, self.public)
+        self.assertEqual(self.read("index.html"), "<title>Home</title><div><p>intro</p><h1>Home</h1><p>text</p></div>")
+
+if __name__ == "__main__":
+    unittest.main()
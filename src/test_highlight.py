@@ -0,0 +1,69 @@
+import os
+import pickle
+import tempfile
+import unittest
+from highlight import HighlightCache, PygmentsHighlighter, make_highlighter, pygments
+from markdown_blocks import fence_language, markdown_to_html_node
+
+# Upper-cases the code of known languages and counts its calls
+class FakeHighlighter():
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def highlight(self, language, code):
+        self.calls += 1
+        if language != "python":
+            return None
+        return f"<b>{code.upper()}</b>"
+
+class TestHighlight(unittest.TestCase):
+    def test_fence_language(self):
+        self.assertEqual(fence_language("```Python"), "python")
+        self.assertEqual(fence_language("``` c++ {1,3}"), "c++")
+        self.assertIsNone(fence_language("```"))
+
+    def test_code_block_classes(self):
+        markdown = "```python\nx = 1\n```\n\n```text\na < b\n```\n\n```\nplain\n```"
+        html = markdown_to_html_node(markdown, highlighter=FakeHighlighter()).to_html()
+        self.assertEqual(
+            html,
+            '<div><pre><code class="language-python"><b>X = 1\n</b></code></pre>'
+            '<pre><code class="language-text">a &lt; b\n</code></pre>'
+            "<pre><code>plain\n</code></pre></div>",
+        )
+
+    def test_cache_reuses_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = FakeHighlighter()
+            cache = HighlightCache(fake, tmp)
+            self.assertEqual(cache.highlight("python", "x\n"), "<b>X\n</b>")
+            self.assertIsNone(cache.highlight("text", "x\n"))
+            # A second cache on the same directory, as in another worker
+            other = HighlightCache(fake, tmp)
+            self.assertEqual(other.highlight("python", "x\n"), "<b>X\n</b>")
+            self.assertIsNone(other.highlight("text", "x\n"))
+            self.assertEqual((fake.calls, other.hits), (2, 2))
+            self.assertFalse([name for _, _, names in os.walk(tmp) for name in names if name.endswith(".tmp")])
+
+    def test_cache_is_pruned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HighlightCache(FakeHighlighter(), tmp, max_entries=1)
+            for i, code in enumerate(("a\n", "b\n")):
+                cache.highlight("python", code)
+                os.utime(cache.entry_path(cache.key("python", code)), ns=(i, i))
+            self.assertEqual(cache.prune(), 1)
+            self.assertTrue(os.path.exists(cache.entry_path(cache.key("python", "b\n"))))
+
+    def test_none_disables_highlighting(self):
+        self.assertIsNone(make_highlighter("none"))
+
+    @unittest.skipIf(pygments is None, "pygments is not installed")
+    def test_pygments_highlighter(self):
+        highlighter = pickle.loads(pickle.dumps(PygmentsHighlighter()))
+        self.assertIn('<span class="k">def</span>', highlighter.highlight("python", "def f(): pass\n"))
+        self.assertIsNone(highlighter.highlight("no-such-language", "x\n"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -121,6 +122,32 @@ class TestParentNodeToHTML(unittest.TestCase):
         parent = ParentNode("section", [child1, child2], props=props)
         expected = '<section class="container" id="main"><p>child1</p><p>child2</p></section>'
         self.assertEqual(parent.to_html(), expected)
-        
+
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_instance_dict(self):
+        for node in [HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+class TestStreamingHTML(unittest.TestCase):
+    def test_iter_html_fragments(self):
+        parent = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(list(parent.iter_html()), ["<p>", "<b>bold</b>", " text", "</p>"])
+
+    def test_iter_html_matches_to_html(self):
+        items = [ParentNode("li", [LeafNode(None, f"item {i}")]) for i in range(1000)]
+        parent = ParentNode("div", [ParentNode("ul", items)], {"class": "list"})
+        self.assertEqual("".join(parent.iter_html()), parent.to_html())
+
+    def test_write(self):
+        parent = ParentNode("div", [ParentNode("span", [LeafNode("b", "grandchild")])])
+        fp = io.StringIO()
+        parent.write(fp)
+        self.assertEqual(fp.getvalue(), "<div><span><b>grandchild</b></span></div>")
+
+    def test_write_raises_for_invalid_child(self):
+        parent = ParentNode("div", [ParentNode("span", None)])
+        with self.assertRaises(ValueError):
+            parent.write(io.StringIO())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
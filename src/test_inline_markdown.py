@@ -6,7 +6,7 @@ from inline_markdown import (
     extract_markdown_links,
     split_nodes_image,
     split_nodes_link,
-    text_to_textnodes
+    text_to_textnodes,
 )
 
 class TestSplitNodesDelimiter(unittest.TestCase):
@@ -298,5 +298,34 @@ class TestTextToTextNodes(unittest.TestCase):
                 self.assertEqual(node.text_type, exp.text_type, f"TextType mismatch at index {idx}")
                 self.assertEqual(node.url, exp.url, f"URL mismatch at index {idx}")
 
+    def test_span_contents_are_literal(self):
+        cases = {
+            "`a_b`": [TextNode("a_b", TextType.CODE)],
+            "[a](http://x/a_b)": [TextNode("a", TextType.LINK, "http://x/a_b")],
+            "![my_img](a.png)": [TextNode("my_img", TextType.IMAGE, "a.png")],
+            "_a **b** c_": [TextNode("a **b** c", TextType.ITALIC)],
+            "**[not a link](url)** then [link](url)": [
+                TextNode("[not a link](url)", TextType.BOLD),
+                TextNode(" then ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "url"),
+            ],
+            "a``b and ****": [TextNode("a", TextType.TEXT), TextNode("b and ", TextType.TEXT)],
+            "[a]([[x](u)b c": [
+                TextNode("[a]([", TextType.TEXT),
+                TextNode("x", TextType.LINK, "u"),
+                TextNode("b c", TextType.TEXT),
+            ],
+            "": [],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(text_to_textnodes(text), expected)
+
+    def test_unclosed_raises(self):
+        for text in ["**bold", "_italic", "`code", "see ![img](src", "see [link](url", "[a](**b**", "[a](![i](p)"]:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+
 if __name__ == '__main__':
     unittest.main()
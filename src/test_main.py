@@ -1,5 +1,11 @@
+import io
+import os
+import tempfile
 import unittest
-from main import extract_title
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import mock
+from main import extract_title, main, make_parser
+from sitefixtures import TEMPLATE, write_file
 
 class TestExtractTitle(unittest.TestCase):
     def test_one_line(self):
@@ -34,5 +40,53 @@ class TestExtractTitle(unittest.TestCase):
         with self.assertRaises(Exception):
             extract_title(title)
 
+class TestCommandLine(unittest.TestCase):
+    def test_clean_removes_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "docs")
+            os.makedirs(os.path.join(output, "blog"))
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(main(["clean", "-o", output]), 0)
+            self.assertFalse(os.path.exists(output))
+
+    def test_build_arguments(self):
+        args, _ = make_parser().parse_known_args(["build", "/blog/", "--shard", "1/2"])
+        self.assertEqual((args.command, args.basepath, args.shard), ("build", "/blog/", (1, 2)))
+        # Highlighting is opt-in: output must not depend on installed packages
+        self.assertEqual(args.highlight, "none")
+
+    def test_watch_builds_then_serves(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "static"))
+            write_file(os.path.join(tmp, "content", "index.md"), "# Home")
+            write_file(os.path.join(tmp, "template.html"), TEMPLATE)
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                with mock.patch("watch.watch_and_serve") as serve, redirect_stdout(io.StringIO()):
+                    self.assertEqual(main(["watch", "/", "--port", "9999"]), 0)
+            finally:
+                os.chdir(cwd)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "docs", "index.html")))
+            self.assertEqual(serve.call_args.args[6], 9999)
+
+    def test_list_only_drafts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, "content", "index.md"), "# Home")
+            write_file(os.path.join(tmp, "content", "draft.md"), "---\ndraft: true\n---\n# Draft")
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            log = io.StringIO()
+            try:
+                with redirect_stdout(log):
+                    self.assertEqual(main(["list", "--only-drafts"]), 0)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(log.getvalue().split(), ["./content/draft.md", "-", "Draft", "(draft)"])
+
+    def test_invalid_shard_is_rejected(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["/blog/", "--shard", "2/2"])
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from manifest import (
+    MANIFEST_NAME,
+    new_manifest,
+    load_manifest,
+    save_manifest,
+    hash_file,
+    is_unchanged,
+    remove_stale,
+    remove_unlisted,
+    write_if_changed,
+)
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_missing_manifest_is_empty(self):
+        self.assertEqual(load_manifest(self.dir, "/"), new_manifest("/"))
+
+    def test_round_trip(self):
+        manifest = new_manifest("/")
+        manifest["template"] = "abc"
+        manifest["pages"]["a.md"] = ["123", "a.html"]
+        save_manifest(self.dir, manifest)
+        self.assertEqual(load_manifest(self.dir, "/"), manifest)
+
+    def test_basepath_change_invalidates_template(self):
+        manifest = new_manifest("/")
+        manifest["template"] = "abc"
+        save_manifest(self.dir, manifest)
+        loaded = load_manifest(self.dir, "/blog/")
+        self.assertIsNone(loaded["template"])
+        self.assertEqual(loaded["basepath"], "/blog/")
+
+    def test_render_changes_invalidate_template(self):
+        for key, value in (("highlighter", "pygments-2.0"), ("parser_version", 0)):
+            with self.subTest(key=key):
+                manifest = new_manifest("/")
+                manifest["template"] = "abc"
+                manifest[key] = value
+                save_manifest(self.dir, manifest)
+                loaded = load_manifest(self.dir, "/")
+                self.assertIsNone(loaded["template"])
+                self.assertEqual(loaded, new_manifest("/"))
+
+    def test_unchanged_manifest_keeps_its_file(self):
+        manifest = new_manifest("/")
+        save_manifest(self.dir, manifest)
+        path = os.path.join(self.dir, MANIFEST_NAME)
+        os.utime(path, ns=(0, 0))
+        save_manifest(self.dir, manifest)
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        manifest["template"] = "abc"
+        save_manifest(self.dir, manifest)
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertEqual(os.listdir(self.dir), [MANIFEST_NAME])
+
+    def test_hash_file_changes_with_content(self):
+        path = self.write("a.md", "one")
+        first = hash_file(path)
+        self.write("a.md", "two")
+        self.assertNotEqual(first, hash_file(path))
+
+    def test_is_unchanged_needs_output(self):
+        dest = os.path.join(self.dir, "a.html")
+        entries = {"a.md": ["123", dest]}
+        self.assertFalse(is_unchanged(entries, "a.md", "123"))
+        self.write("a.html", "")
+        self.assertTrue(is_unchanged(entries, "a.md", "123"))
+        self.assertFalse(is_unchanged(entries, "a.md", "456"))
+        self.assertFalse(is_unchanged(entries, "b.md", "123"))
+
+    def test_remove_stale(self):
+        kept = self.write("out/kept.html", "")
+        gone = self.write("out/sub/gone.html", "")
+        old = {"kept.md": ["1", kept], "gone.md": ["2", gone]}
+        new = {"kept.md": ["1", kept]}
+        self.assertEqual(remove_stale(old, new), 1)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(gone))
+        self.assertFalse(os.path.exists(os.path.dirname(gone)))
+    def test_remove_unlisted(self):
+        kept = self.write("out/blog/kept.html", "")
+        self.write("out/blog/old/gone.html", "")
+        self.write("out/stray.txt", "")
+        self.write("out/.manifest.json", "{}")
+        manifest = new_manifest("/")
+        manifest["pages"]["kept.md"] = ["1", kept]
+        self.assertEqual(remove_unlisted(os.path.join(self.dir, "out"), manifest), 2)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "out", "blog", "old")))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "out", ".manifest.json")))
+
+    def test_write_if_changed_keeps_identical_file(self):
+        path = self.write("a.html", "same")
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(write_if_changed(path, lambda file: file.write("same")))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_if_changed(path, lambda file: file.write("new")))
+        with open(path) as file:
+            self.assertEqual(file.read(), "new")
+        self.assertEqual(os.listdir(self.dir), ["a.html"])
+
+    def test_write_if_changed_leaves_file_on_error(self):
+        path = self.write("a.html", "old")
+
+        def fail(file):
+            file.write("partial")
+            raise ValueError("render failed")
+
+        with self.assertRaises(ValueError):
+            write_if_changed(path, fail)
+        with open(path) as file:
+            self.assertEqual(file.read(), "old")
+        self.assertEqual(os.listdir(self.dir), ["a.html"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,13 @@
+import io
 import unittest
+from textnode import URLContext
 from markdown_blocks import (
     BlockType, 
     markdown_to_blocks, 
     block_to_block_type,
-    markdown_to_html_node
+    markdown_to_html_node,
+    iter_blocks,
+    iter_markdown_html,
 )
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -152,6 +156,48 @@ class TestBlockToHtml(unittest.TestCase):
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_url_context(self):
+        md = "See [home](/index.html) and `href=\"/x\"`\n\n- ![pic](/a.png)"
+        html = markdown_to_html_node(md, URLContext("/site/")).to_html()
+        self.assertEqual(
+            html,
+            '<div><p>See <a href="/site/index.html">home</a> and <code>href="/x"</code></p>'
+            '<ul><li><img src="/site/a.png" alt="pic"></img></li></ul></div>',
+        )
+
+    def test_blocks_keep_document_order(self):
+        md = "First paragraph\n\n> A quote\n\nLast paragraph"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><p>First paragraph</p><blockquote>A quote</blockquote><p>Last paragraph</p></div>",
+        )
+
+class TestStreamingBlocks(unittest.TestCase):
+    def test_iter_blocks_from_file(self):
+        fp = io.StringIO("# Title\n\n  - a\n- b\n\n\n```\ncode\n```\n")
+        self.assertEqual(
+            list(iter_blocks(fp)),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.ULIST, ["- a", "- b"]),
+                (BlockType.CODE, ["```", "code", "```"]),
+            ],
+        )
+
+    def test_iter_blocks_narrows_type_per_line(self):
+        md = "1. a\n2. b\n4. c\n\n- a\n \n- b\n\n```\ncode\n\n> a\n> b"
+        self.assertEqual(
+            [block_type for block_type, _ in iter_blocks(md.split("\n"))],
+            [BlockType.PARAGRAPH, BlockType.PARAGRAPH, BlockType.PARAGRAPH, BlockType.QUOTE],
+        )
+
+    def test_iter_markdown_html_matches_tree(self):
+        md = "# Title\n\nSome **bold** text\n\n1. one\n2. two\n\n> quote"
+        expected = markdown_to_html_node(md).to_html()
+        self.assertEqual("".join(iter_markdown_html(md)), expected)
+        self.assertEqual("".join(iter_markdown_html(io.StringIO(md))), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
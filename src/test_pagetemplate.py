@@ -0,0 +1,37 @@
+import io
+import unittest
+from pagetemplate import PageTemplate
+
+class TestPageTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = PageTemplate("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.segments,
+            ["<title>", "Title", "</title><body>", "Content", "</body>"],
+        )
+
+    def test_render(self):
+        template = PageTemplate("<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(template.render("Hi", "<p>text</p>"), "<h1>Hi</h1><p>text</p>")
+
+    def test_basepath_rewritten_once(self):
+        template = PageTemplate('<link href="/index.css"><img src="/a.png">{{ Content }}', "/blog/")
+        self.assertEqual(
+            template.render("", ""),
+            '<link href="/blog/index.css"><img src="/blog/a.png">',
+        )
+
+    def test_write_streams_fragments(self):
+        template = PageTemplate("<main>{{ Content }}</main>")
+        fp = io.StringIO()
+        template.write(fp, "", iter(["<p>", "a", "</p>"]))
+        self.assertEqual(fp.getvalue(), "<main><p>a</p></main>")
+
+    def test_write_repeated_content_slot(self):
+        template = PageTemplate("{{ Content }}|{{ Content }}")
+        fp = io.StringIO()
+        template.write(fp, "", iter(["a", "b"]))
+        self.assertEqual(fp.getvalue(), "ab|ab")
+
+if __name__ == "__main__":
+    unittest.main()
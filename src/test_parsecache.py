@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from parsecache import ParseCache
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.tmp.name, max_entries=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss_then_hit(self):
+        key = self.cache.key("# Title", "/")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(self.cache.get(key), ("Title", "<div><h1>Title</h1></div>"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_basepath(self):
+        self.assertNotEqual(self.cache.key("# A", "/"), self.cache.key("# A", "/blog/"))
+        self.assertEqual(self.cache.key("# A", "/"), self.cache.key("# A", "/"))
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# {i}", "/") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, str(i), "")
+            os.utime(self.cache.entry_path(key), ns=(i, i))
+        # Reading the oldest entry makes it the most recently used
+        self.cache.get(keys[0])
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_failed_put_leaves_no_files(self):
+        key = self.cache.key("# A", "/")
+        with self.assertRaises(TypeError):
+            self.cache.put(key, "A", object())
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.entry_path(key))), [])
+        self.assertIsNone(self.cache.get(key))
+
+if __name__ == "__main__":
+    unittest.main()
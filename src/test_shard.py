@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from copystatic import copy_files
+from depgraph import DependencyGraph, DEPS_NAME
+from gencontent import generate_page_all
+from shard import parse_shard, shard_of, owns_static, merge_shards, list_outputs
+from sitefixtures import TempSiteTestCase
+
+class TestShard(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_template()
+        for i in range(12):
+            self.write(os.path.join(self.content, f"dir{i % 3}", f"page{i}.md"), f"# Page {i}\n\n[home](/)")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def build(self, dest, shard=None):
+        deps = DependencyGraph()
+        with redirect_stdout(io.StringIO()):
+            if owns_static(shard):
+                copy_files(self.static, dest)
+            generate_page_all("/", self.content, self.template, dest, deps=deps, shard=shard)
+        deps.save(dest)
+
+    def read_tree(self, dir_path):
+        tree = {}
+        for rel_path in list_outputs(dir_path):
+            with open(os.path.join(dir_path, rel_path)) as file:
+                tree[rel_path] = file.read()
+        return tree
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("4/4", "1", "a/2", "0/0", "-1/2"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_partition_is_stable(self):
+        path = os.path.join(self.content, "dir0", "page0.md")
+        self.assertEqual(shard_of(path, self.content, 3), shard_of("content/dir0/page0.md", "content", 3))
+
+    def test_merged_shards_match_monolithic_build(self):
+        whole = os.path.join(self.root, "whole")
+        self.build(whole)
+        shard_dirs = []
+        for i in range(3):
+            shard_dirs.append(os.path.join(self.root, f"shard{i}"))
+            self.build(shard_dirs[-1], (i, 3))
+        merged = os.path.join(self.root, "merged")
+        with redirect_stdout(io.StringIO()):
+            merge_shards(shard_dirs, merged)
+        self.assertEqual(self.read_tree(merged), self.read_tree(whole))
+        with open(os.path.join(whole, DEPS_NAME)) as file:
+            whole_deps = json.load(file)
+        with open(os.path.join(merged, DEPS_NAME)) as file:
+            merged_deps = json.load(file)
+        self.assertEqual(merged_deps.keys(), whole_deps.keys())
+        for from_path, page in whole_deps.items():
+            self.assertEqual(
+                os.path.relpath(merged_deps[from_path]["output"], merged),
+                os.path.relpath(page["output"], whole),
+            )
+
+    def test_duplicate_output_is_rejected(self):
+        first = os.path.join(self.root, "first")
+        second = os.path.join(self.root, "second")
+        self.build(first, (0, 2))
+        self.build(second, (0, 2))
+        merged = os.path.join(self.root, "merged")
+        with self.assertRaises(ValueError):
+            merge_shards([first, second], merged)
+        self.assertFalse(os.path.exists(merged))
+
+    def test_invalid_shard_directories_keep_the_output(self):
+        shard_dirs = [os.path.join(self.root, f"shard{i}") for i in range(2)]
+        for i, shard_dir in enumerate(shard_dirs):
+            self.build(shard_dir, (i, 2))
+        before = self.read_tree(shard_dirs[0])
+        missing = os.path.join(self.root, "missing")
+        for dirs, dest in ((shard_dirs, shard_dirs[0]), ([shard_dirs[0], missing], shard_dirs[1])):
+            with self.subTest(dest=dest), self.assertRaises(ValueError):
+                merge_shards(dirs, dest)
+        self.assertEqual(self.read_tree(shard_dirs[0]), before)
+        self.assertTrue(os.path.isdir(shard_dirs[1]))
+        with self.assertRaises(FileNotFoundError):
+            list_outputs(missing)
+
+if __name__ == "__main__":
+    unittest.main()
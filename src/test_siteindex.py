@@ -0,0 +1,109 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from depgraph import DependencyGraph
+from manifest import new_manifest
+from siteindex import IndexOptions, write_site_indexes, rel_path_url
+from sitefixtures import TempSiteTestCase
+
+class TestSiteIndex(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_template()
+        self.deps = DependencyGraph()
+        self.add_page("index.md", "Home &amp; Garden", 0)
+        for i in range(5):
+            self.add_page(f"blog/post{i}/index.md", f"Post {i}", 86400 * i)
+
+    # Pages only exist in the graph: the indexes must not read content/
+    def add_page(self, rel_path, title, updated):
+        from_path = os.path.join(self.content, rel_path)
+        dest_path = os.path.join(self.public, rel_path.replace(".md", ".html"))
+        self.deps.record_page(from_path, dest_path, self.template, [], [], {"title": title, "updated": updated})
+
+    def build(self, options, manifest=None):
+        with redirect_stdout(io.StringIO()):
+            return write_site_indexes(self.deps, "/site/", self.content, self.template, self.public, options, manifest)
+
+    def test_paginated_listing_newest_first(self):
+        entries = self.build(IndexOptions(None, "blog", 2, 20))
+        self.assertEqual(
+            sorted(entries),
+            ["blog/index.html", "blog/page/2/index.html", "blog/page/3/index.html"],
+        )
+        first = self.read("blog/index.html")
+        self.assertLess(first.index("Post 4"), first.index("Post 3"))
+        self.assertNotIn("Post 2", first)
+        self.assertIn('<a href="/site/blog/page/2/">Older posts</a>', first)
+        self.assertIn('<a href="/site/blog/page/2/">Newer posts</a>', self.read("blog/page/3/index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "sitemap.xml")))
+
+    def test_sitemap_and_feed(self):
+        self.build(IndexOptions("https://example.org/", "blog", 10, 2))
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.org/site/</loc>", sitemap)
+        self.assertIn("<loc>https://example.org/site/blog/post0/</loc><lastmod>1970-01-01T00:00:00+00:00</lastmod>", sitemap)
+        self.assertIn("<loc>https://example.org/site/blog/</loc>", sitemap)
+        feed = self.read("atom.xml")
+        self.assertIn('<title type="html">Home &amp;amp; Garden</title>', feed)
+        self.assertEqual(feed.count("<entry>"), 2)
+        self.assertIn('<link href="https://example.org/site/blog/post4/"/>', feed)
+
+    def test_feed_categories_from_tags(self):
+        from_path = os.path.join(self.content, "blog/post4/index.md")
+        self.deps.pages[from_path]["meta"]["tags"] = ["tolkien", "a&b"]
+        self.build(IndexOptions("https://example.org", "blog", 10, 1))
+        self.assertIn('<category term="tolkien"/><category term="a&amp;b"/></entry>', self.read("atom.xml"))
+
+    def test_feed_authors(self):
+        self.build(IndexOptions("https://example.org", "blog", 10, 20))
+        self.assertIn("<author><name>Home &amp; Garden</name></author>", self.read("atom.xml"))
+        self.deps.pages[os.path.join(self.content, "index.md")]["meta"]["author"] = "Tom"
+        self.deps.pages[os.path.join(self.content, "blog/post4/index.md")]["meta"]["author"] = "Goldberry"
+        self.build(IndexOptions("https://example.org", "blog", 10, 20))
+        feed = self.read("atom.xml")
+        self.assertIn("<author><name>Tom</name></author>", feed)
+        self.assertIn("<author><name>Goldberry</name></author><", feed)
+        self.build(IndexOptions("https://example.org", "blog", 10, 20, author="Bombadil"))
+        self.assertIn("<updated>1970-01-05T00:00:00+00:00</updated>\n<author><name>Bombadil</name></author>", self.read("atom.xml"))
+
+    def test_tag_pages(self):
+        for i, tags in ((1, ["Elves"]), (3, ["elves", "a&b", "elves"])):
+            self.deps.pages[os.path.join(self.content, f"blog/post{i}/index.md")]["meta"]["tags"] = tags
+        entries = self.build(IndexOptions(None, "blog", 10, 20))
+        self.assertIn("tags/elves/index.html", entries)
+        elves = self.read("tags/elves/index.html")
+        self.assertEqual(elves.count("<li>"), 2)
+        self.assertLess(elves.index("Post 3"), elves.index("Post 1"))
+        self.assertIn('<a href="/site/tags/a-b/">a&amp;b</a> (1)', self.read("tags/index.html"))
+
+    def test_stale_listing_pages_are_removed(self):
+        manifest = new_manifest("/site/")
+        self.build(IndexOptions(None, "blog", 2, 20), manifest)
+        for i in range(2, 5):
+            self.deps.remove_page(os.path.join(self.content, f"blog/post{i}/index.md"))
+        self.build(IndexOptions(None, "blog", 2, 20), manifest)
+        self.assertEqual(sorted(manifest["indexes"]), ["blog/index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page")))
+
+    def test_blog_landing_page_keeps_its_output(self):
+        self.add_page("blog/index.md", "Blog", 0)
+        entries = self.build(IndexOptions(None, "blog", 3, 20))
+        self.assertEqual(sorted(entries), ["blog/page/1/index.html", "blog/page/2/index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+        self.assertIn('<a href="/site/blog/page/1/">Newer posts</a>', self.read("blog/page/2/index.html"))
+
+    def test_page_output_conflict(self):
+        self.add_page("sitemap.md", "Sitemap", 0)
+        self.deps.pages[os.path.join(self.content, "sitemap.md")]["output"] = os.path.join(self.public, "sitemap.xml")
+        with self.assertRaises(ValueError):
+            self.build(IndexOptions("https://example.org", "blog", 10, 20))
+
+    def test_rel_path_url(self):
+        self.assertEqual(rel_path_url("/", "index.html"), "/")
+        self.assertEqual(rel_path_url("/x/", "blog/tom/index.html"), "/x/blog/tom/")
+        self.assertEqual(rel_path_url("/x/", "feed.xml"), "/x/feed.xml")
+
+if __name__ == "__main__":
+    unittest.main()
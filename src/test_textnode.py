@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import TextNode, TextType, URLContext, text_node_to_html_node
 from htmlnode import LeafNode
 
 
@@ -36,6 +36,10 @@ class TestTextNode(unittest.TestCase):
         node3 = TextNode("World", TextType.TEXT)
         self.assertFalse(node1 == node3, "Nodes with different text should not be equal.")
 
+    def test_no_instance_dict(self):
+        node = TextNode("Hello", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     # Tests for textNodeToHTMLNode
     def test_text(self):
         node = TextNode("This is a text node", TextType.TEXT)
@@ -98,6 +102,33 @@ class TestTextNode(unittest.TestCase):
             text_node_to_html_node(node)
         self.assertEqual(str(cm.exception), "Invalid text type")
 
+    def test_url_context_prefixes_root_relative(self):
+        context = URLContext("/blog/")
+        link = text_node_to_html_node(TextNode("Home", TextType.LINK, "/index.html"), context)
+        self.assertEqual(link.props, {"href": "/blog/index.html"})
+        image = text_node_to_html_node(TextNode("Alt", TextType.IMAGE, "/images/a.png"), context)
+        self.assertEqual(image.props, {"src": "/blog/images/a.png", "alt": "Alt"})
+
+    def test_url_context_keeps_other_urls(self):
+        context = URLContext("/blog/")
+        link = text_node_to_html_node(TextNode("Ext", TextType.LINK, "https://boot.dev"), context)
+        self.assertEqual(link.props, {"href": "https://boot.dev"})
+        code = text_node_to_html_node(TextNode('href="/a"', TextType.CODE), context)
+        self.assertEqual(code.value, 'href="/a"')
+
+    def test_text_is_escaped(self):
+        code = text_node_to_html_node(TextNode("if a < b && c > d:", TextType.CODE))
+        self.assertEqual(code.to_html(), "<code>if a &lt; b &amp;&amp; c &gt; d:</code>")
+        text = text_node_to_html_node(TextNode('plain "quoted" text', TextType.TEXT))
+        self.assertEqual(text.value, 'plain "quoted" text')
+
+    def test_attributes_are_escaped(self):
+        image = text_node_to_html_node(TextNode('say "hi" <now>', TextType.IMAGE, "/a.png?x=1&y=2"))
+        self.assertEqual(
+            image.to_html(),
+            '<img src="/a.png?x=1&amp;y=2" alt="say &quot;hi&quot; &lt;now&gt;"></img>',
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import shutil
+import unittest
+from types import SimpleNamespace
+from siteindex import IndexOptions
+from sitefixtures import TempSiteTestCase
+from watch import SiteWatcher, ReloadNotifier, EventCollector, Observer
+
+class TestSiteWatcher(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_template()
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static, "a.css"), "body {}")
+        self.watcher = SiteWatcher("/", self.content, self.static, self.template, self.public)
+
+    def write(self, path, text):
+        super().write(path, text)
+        # Make sure the change is visible even with coarse mtimes
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_poll_reports_changes(self):
+        self.assertEqual(self.watcher.poll(), ([], []))
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        os.remove(os.path.join(self.static, "a.css"))
+        changed, removed = self.watcher.poll()
+        self.assertEqual(changed, [os.path.join(self.content, "index.md")])
+        self.assertEqual(removed, [os.path.join(self.static, "a.css")])
+
+    def test_poll_paths_matches_poll(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.write(os.path.join(self.content, "new", "a.md"), "# A")
+        shutil.rmtree(os.path.join(self.content, "blog"))
+        event_paths = [
+            os.path.abspath(os.path.join(self.content, "index.md")),
+            os.path.join(self.content, "new"),
+            os.path.join(self.content, "blog"),
+            os.path.join(self.root, "elsewhere.txt"),
+        ]
+        watcher = SiteWatcher("/", self.content, self.static, self.template, self.public)
+        watcher.snapshot = dict(self.watcher.snapshot)
+        changes = [sorted(paths) for paths in watcher.poll_paths(event_paths)]
+        self.assertEqual(changes, [sorted(paths) for paths in self.watcher.poll()])
+        self.assertEqual(watcher.snapshot, self.watcher.snapshot)
+
+    def test_event_collector(self):
+        events = EventCollector()
+        events.dispatch(SimpleNamespace(event_type="modified", is_directory=True, src_path=self.content))
+        events.dispatch(SimpleNamespace(event_type="opened", is_directory=False, src_path="a.md"))
+        self.assertEqual(events.take(timeout=0), set())
+        events.dispatch(SimpleNamespace(event_type="moved", is_directory=False, src_path="a.md", dest_path="b.md"))
+        self.assertEqual(events.take(timeout=0), {"a.md", "b.md"})
+
+    @unittest.skipIf(Observer is None, "watchdog is not installed")
+    def test_observer_reports_edits(self):
+        events = EventCollector()
+        observer = self.watcher.start_observer(events)
+        try:
+            path = os.path.join(self.content, "blog", "post.md")
+            self.write(path, "# Edited")
+            changed = []
+            while not changed:
+                paths = events.take(timeout=5)
+                self.assertTrue(paths)
+                changed, _ = self.watcher.poll_paths(paths)
+            self.assertEqual(changed, [path])
+        finally:
+            observer.stop()
+            observer.join()
+
+    def test_rebuild_single_page_and_asset(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Changed")
+        self.write(os.path.join(self.static, "img", "b.png"), "png")
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(self.read("blog", "post.html"), "<title>Changed</title><div><h1>Changed</h1></div>")
+        self.assertEqual(self.read("img", "b.png"), "png")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_template_change_regenerates_all(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(self.read("index.html"), "<h1>Home</h1>")
+        self.assertEqual(self.read("blog", "post.html"), "<h1>Post</h1>")
+
+    def test_drafts_are_not_published(self):
+        watcher = SiteWatcher("/", self.content, self.static, self.template, self.public, drafts=False)
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        watcher.rebuild(*watcher.poll())
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ndraft: true\n---\n# Post")
+        self.write(os.path.join(self.content, "blog", "new.md"), "---\ndraft: true\n---\n# New")
+        watcher.rebuild(*watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertNotIn(os.path.join(self.content, "blog", "post.md"), watcher.deps.pages)
+
+    def test_blog_listing_follows_rebuilds(self):
+        watcher = SiteWatcher("/", self.content, self.static, self.template, self.public, indexes=IndexOptions(None, "blog", 10, 20))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# First title")
+        watcher.rebuild(*watcher.poll())
+        self.assertIn("First title", self.read("blog", "index.html"))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Second title")
+        watcher.rebuild(*watcher.poll())
+        listing = self.read("blog", "index.html")
+        self.assertIn("Second title", listing)
+        self.assertNotIn("First title", listing)
+
+    def test_removed_page_is_deleted(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.watcher.rebuild(*self.watcher.poll())
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+class TestReloadNotifier(unittest.TestCase):
+    def test_wait_returns_new_version(self):
+        notifier = ReloadNotifier()
+        self.assertEqual(notifier.wait(0, timeout=0), 0)
+        notifier.notify()
+        self.assertEqual(notifier.wait(0, timeout=0), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,8 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -24,20 +26,58 @@ class TextNode():
     
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
-    
-def text_node_to_html_node(text_node):
+
+# Prefixing root-relative link and image URLs with the site basepath
+class URLContext():
+    def __init__(self, basepath="/"):
+        self.basepath = basepath
+
+    def rewrite(self, url):
+        if self.basepath == "/" or not url.startswith("/"):
+            return url
+        return self.basepath + url[1:]
+
+    def __repr__(self):
+        return f"URLContext({self.basepath})"
+
+# Text is escaped here, once, on its way into a LeafNode; node values and
+# props are HTML from then on and are rendered as they are
+def text_node_to_html_node(text_node, url_context=None):
+    url = text_node.url
+    if url is not None and url_context is not None:
+        url = url_context.rewrite(url)
+
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(None, text_node.text)
+            return LeafNode(None, escape_text(text_node.text))
         case TextType.BOLD:
-            return LeafNode("b",text_node.text)
+            return LeafNode("b", escape_text(text_node.text))
         case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
+            return LeafNode("i", escape_text(text_node.text))
         case TextType.CODE:
-            return LeafNode("code", text_node.text)
+            return LeafNode("code", escape_text(text_node.text))
         case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return LeafNode("a", escape_text(text_node.text), {"href": escape_attribute(url)})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src":text_node.url,"alt":text_node.text})
+            return LeafNode("img", "", {"src": escape_attribute(url), "alt": escape_attribute(text_node.text)})
         case _:
-            raise Exception("Invalid text type")
\ No newline at end of file
+            raise Exception("Invalid text type")
+
+# Escaping &, < and > in text content. Most text contains none of them:
+# it costs three scans and is returned as is. A character is only replaced
+# when present (str.translate with string values is far slower here).
+def escape_text(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+# Attribute values are double-quoted, so quotes are escaped as well
+def escape_attribute(value):
+    value = escape_text(value)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    return value
@@ -0,0 +1,382 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from copystatic import copy_file
+from depgraph import load_graph
+from gencontent import generate_page, generate_pages, find_pages, is_draft, uses_template
+from highlight import highlighter_name
+from manifest import load_manifest, remove_empty_dirs, save_manifest
+from pagetemplate import load_template
+from siteindex import write_site_indexes
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}").onmessage = () => location.reload();</script>'
+)
+# Without watchdog the sources are rescanned, and the next scan waits at
+# least this many times as long as the last one took, so a large tree
+# keeps the watcher at a bounded share of one core
+SCAN_LOAD_FACTOR = 10
+# Filesystem events that can change a source; opened and read-only closes
+# are ignored
+WATCHED_EVENTS = ("created", "modified", "deleted", "moved", "closed")
+
+
+# Keeps the compiled template warm and maps each changed source to the
+# smallest rebuild: one page, one asset copy, or the pages using the template.
+# Changes are found from filesystem events when watchdog is installed, and
+# by rescanning the sources otherwise.
+# With drafts=False, pages marked as drafts are not built, and a page that
+# becomes a draft has its output removed. With index options, the blog
+# listing, sitemap and feed are rewritten after every page rebuild.
+class SiteWatcher():
+    def __init__(self, basepath, dir_path_content, dir_path_static, template_path, dest_dir_path, parse_cache=None, highlighter=None, drafts=True, indexes=None):
+        self.basepath = basepath
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.dest_dir_path = dest_dir_path
+        self.parse_cache = parse_cache
+        self.highlighter = highlighter
+        self.drafts = drafts
+        self.indexes = indexes
+        self.template = load_template(template_path, basepath)
+        self.deps = load_graph(dest_dir_path)
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for dir_path in (self.dir_path_content, self.dir_path_static):
+            if os.path.isdir(dir_path):
+                scan_tree(dir_path, snapshot)
+        if os.path.exists(self.template_path):
+            stat = os.stat(self.template_path)
+            snapshot[self.template_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    # Returning (changed, removed) source paths since the previous poll
+    def poll(self):
+        snapshot = self.scan()
+        changed = [path for path, stamp in snapshot.items() if self.snapshot.get(path) != stamp]
+        removed = [path for path in self.snapshot if path not in snapshot]
+        self.snapshot = snapshot
+        return changed, removed
+
+    # Same as poll(), but only looking at the given files and directories
+    # (the paths named by filesystem events)
+    def poll_paths(self, paths):
+        changed = []
+        removed = []
+        for path in sorted(filter(None, map(self.source_path, paths))):
+            found = {}
+            if os.path.isdir(path):
+                scan_tree(path, found)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                found[path] = (stat.st_mtime_ns, stat.st_size)
+            if path not in found:
+                # A deleted or replaced directory takes its files along
+                prefix = os.path.join(path, "")
+                removed.extend(
+                    old_path for old_path in self.snapshot
+                    if (old_path == path or old_path.startswith(prefix)) and old_path not in found
+                )
+            for new_path, stamp in found.items():
+                if self.snapshot.get(new_path) != stamp:
+                    changed.append(new_path)
+                    self.snapshot[new_path] = stamp
+        for path in removed:
+            self.snapshot.pop(path, None)
+        return changed, removed
+
+    # The snapshot key of a path reported by an event, or None if the path
+    # is not a source
+    def source_path(self, path):
+        if os.path.abspath(path) == os.path.abspath(self.template_path):
+            return self.template_path
+        for dir_path in (self.dir_path_content, self.dir_path_static):
+            if is_inside(path, dir_path):
+                relative_path = os.path.relpath(path, dir_path)
+                return dir_path if relative_path == "." else os.path.join(dir_path, relative_path)
+        return None
+
+    def rebuild(self, changed, removed):
+        if self.template_path in changed:
+            print("Template changed, regenerating all pages")
+            self.template = load_template(self.template_path, self.basepath)
+            pages = [
+                (from_path, dest_path)
+                for from_path, dest_path in find_pages(self.dir_path_content, self.dest_dir_path)
+                if uses_template(self.deps, from_path, self.template_path)
+                and not self.skip_draft(from_path)
+            ]
+            generate_pages(
+                self.basepath, pages, self.template_path, parse_cache=self.parse_cache, deps=self.deps,
+                highlighter=self.highlighter,
+            )
+            changed = [path for path in changed if not self.is_content(path)]
+
+        for path in changed:
+            if path == self.template_path:
+                continue
+            dest_path = self.dest_path(path)
+            if self.is_content(path) and self.skip_draft(path):
+                print(f"Skipping draft {path}")
+                self.remove_output(path, dest_path)
+            elif self.is_content(path):
+                generate_page(
+                    self.basepath,
+                    path,
+                    self.template_path,
+                    dest_path,
+                    self.template,
+                    self.parse_cache,
+                    deps=self.deps,
+                    highlighter=self.highlighter,
+                )
+            else:
+                print(f" * {path} -> {dest_path}")
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                copy_file(path, dest_path)
+
+        for path in removed:
+            if path == self.template_path:
+                continue
+            self.remove_output(path, self.dest_path(path))
+            if not self.is_content(path):
+                relative_path = os.path.relpath(path, self.dir_path_static)
+                for page in self.deps.pages_using(relative_path):
+                    print(f"Warning: {page} still references {relative_path}")
+
+        if self.indexes is not None and any(
+            path == self.template_path or self.is_content(path) for path in changed + removed
+        ):
+            manifest = load_manifest(self.dest_dir_path, self.basepath, highlighter_name(self.highlighter))
+            write_site_indexes(
+                self.deps,
+                self.basepath,
+                self.dir_path_content,
+                self.template_path,
+                self.dest_dir_path,
+                self.indexes,
+                manifest,
+            )
+            save_manifest(self.dest_dir_path, manifest)
+        self.deps.save(self.dest_dir_path)
+
+    def skip_draft(self, path):
+        return not self.drafts and is_draft(path)
+
+    def remove_output(self, path, dest_path):
+        if os.path.exists(dest_path):
+            print(f" - {dest_path}")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path))
+        if self.is_content(path):
+            self.deps.remove_page(path)
+
+    def is_content(self, path):
+        return is_inside(path, self.dir_path_content)
+
+    def dest_path(self, path):
+        if self.is_content(path):
+            relative_path = os.path.relpath(path, self.dir_path_content)
+            return str(Path(self.dest_dir_path, relative_path).with_suffix(".html"))
+        relative_path = os.path.relpath(path, self.dir_path_static)
+        return os.path.join(self.dest_dir_path, relative_path)
+
+    def watch(self, notifier=None, interval=0.05):
+        events = EventCollector()
+        observer = self.start_observer(events)
+        if observer is None:
+            self.rebuild_changes(self.scan_changes(interval), notifier)
+            return
+        try:
+            self.rebuild_changes(self.event_changes(events), notifier)
+        finally:
+            observer.stop()
+            observer.join()
+
+    # A running watchdog observer feeding events, or None when watchdog is
+    # missing or cannot watch the sources
+    def start_observer(self, events):
+        if Observer is None:
+            print("Scanning for changes (install watchdog to watch large sites efficiently)")
+            return None
+        observer = Observer()
+        try:
+            for dir_path in (self.dir_path_content, self.dir_path_static):
+                if os.path.isdir(dir_path):
+                    observer.schedule(events, dir_path, recursive=True)
+            observer.schedule(events, os.path.dirname(self.template_path) or ".")
+            observer.start()
+        except OSError as error:
+            print(f"Scanning for changes (cannot watch for events: {error})")
+            return None
+        return observer
+
+    def event_changes(self, events):
+        while True:
+            yield self.poll_paths(events.take())
+
+    # Rescanning every interval seconds, or more rarely when scans are slow
+    def scan_changes(self, interval):
+        delay = interval
+        while True:
+            time.sleep(delay)
+            start = time.perf_counter()
+            changes = self.poll()
+            delay = max(interval, (time.perf_counter() - start) * SCAN_LOAD_FACTOR)
+            yield changes
+
+    def rebuild_changes(self, changes, notifier=None):
+        for changed, removed in changes:
+            if not changed and not removed:
+                continue
+            start = time.perf_counter()
+            try:
+                self.rebuild(changed, removed)
+            except Exception as error:
+                print(f"Rebuild failed: {error}")
+                continue
+            print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.1f}ms")
+            if notifier is not None:
+                notifier.notify()
+
+# Event handler for watchdog: collects the paths events name until the
+# watcher takes them
+class EventCollector():
+    def __init__(self):
+        self.paths = set()
+        self.condition = threading.Condition()
+
+    def dispatch(self, event):
+        if event.event_type not in WATCHED_EVENTS or (event.is_directory and event.event_type == "modified"):
+            return
+        with self.condition:
+            self.paths.add(os.fsdecode(event.src_path))
+            if getattr(event, "dest_path", ""):
+                self.paths.add(os.fsdecode(event.dest_path))
+            self.condition.notify_all()
+
+    # Waiting for at least one path, then returning and clearing them all
+    def take(self, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.paths, timeout)
+            paths = self.paths
+            self.paths = set()
+            return paths
+
+
+def scan_tree(dir_path, snapshot):
+    for entry in os.scandir(dir_path):
+        if entry.is_dir():
+            scan_tree(entry.path, snapshot)
+        else:
+            stat = entry.stat()
+            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+def is_inside(path, dir_path):
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(dir_path)]) == os.path.abspath(dir_path)
+
+
+# Counter of finished rebuilds that the reload endpoint waits on
+class ReloadNotifier():
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    notifier = None
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.send_html(path)
+            return
+        super().do_GET()
+
+    # Injecting the live-reload client into every served page
+    def send_html(self, path):
+        with open(path, "rb") as file:
+            body = file.read()
+        body = body.replace(b"</body>", RELOAD_SCRIPT.encode() + b"</body>", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Server-sent events: one "reload" message per finished rebuild
+    def send_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.notifier.version
+        try:
+            while True:
+                new_version = self.notifier.wait(version, timeout=15)
+                if new_version == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = new_version
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(dest_dir_path, notifier, port=8888):
+    handler = functools.partial(DevRequestHandler, directory=dest_dir_path)
+    DevRequestHandler.notifier = notifier
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {dest_dir_path} at http://127.0.0.1:{port}/")
+    return server
+
+
+def watch_and_serve(basepath, dir_path_content, dir_path_static, template_path, dest_dir_path, parse_cache=None, port=8888, highlighter=None, drafts=True, indexes=None):
+    watcher = SiteWatcher(
+        basepath, dir_path_content, dir_path_static, template_path, dest_dir_path, parse_cache, highlighter, drafts, indexes
+    )
+    notifier = ReloadNotifier()
+    server = serve(dest_dir_path, notifier, port)
+    print(f"Watching {dir_path_content}, {dir_path_static} and {template_path} for changes...")
+    try:
+        watcher.watch(notifier)
+    except KeyboardInterrupt:
+        print("Stopping watch mode")
+    finally:
+        server.shutdown()